@@ -0,0 +1,79 @@
+"""Time price downloads through the Fetcher against the old single yf.download call, without network access.
+
+    python benchmarks/bench_fetch.py
+    python benchmarks/bench_fetch.py --sizes 50 500 --latency 0.2 --fail-rate 0.02
+
+Every symbol costs ``--latency`` seconds, like one Yahoo Finance history
+request. The baseline stands in for ``yf.download(tickers, threads=True)``:
+one call that fetches symbols on two threads per CPU, where any error fails
+the whole call. The Fetcher runs ``close_frame`` over its batches with its
+default batch size and workers; ``--fail-rate`` makes that share of symbol
+requests raise, as a rate limit would, to show the retry cost.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rrg.fetch import Fetcher, close_frame  # noqa: E402
+
+
+def symbol_source(latency, fail_rate, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def symbol_close(ticker, start, end):
+        time.sleep(latency)
+        if rng.random() < fail_rate:
+            raise RuntimeError(f"Too many requests for {ticker}")
+        index = pd.bdate_range(start, end)
+        return pd.Series(np.linspace(100, 110, len(index)), index=index)
+    return symbol_close
+
+
+def baseline(tickers, start, end, symbol_close):
+    # Threads as in yf.download(threads=True); one failure loses the call
+    with ThreadPoolExecutor(max_workers=min(len(tickers), 2 * (os.cpu_count() or 1))) as pool:
+        return pd.DataFrame(dict(zip(tickers, pool.map(lambda t: symbol_close(t, start, end), tickers))))
+
+
+def timed_run(func):
+    started = time.perf_counter()
+    try:
+        frame = func()
+        return time.perf_counter() - started, len(frame.columns)
+    except Exception:
+        return time.perf_counter() - started, 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500], help="Tickers per download")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per symbol request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of symbol requests that raise")
+    args = parser.parse_args(argv)
+
+    start, end = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-12-31")
+    rows = []
+    for size in args.sizes:
+        tickers = [f"T{i:04d}" for i in range(size)]
+        old_seconds, old_count = timed_run(
+            lambda: baseline(tickers, start, end, symbol_source(args.latency, args.fail_rate)))
+        symbol_close = symbol_source(args.latency, args.fail_rate)
+        fetcher = Fetcher(lambda batch, s, e: close_frame(batch, lambda t: symbol_close(t, s, e)), backoff=0.1)
+        new_seconds, new_count = timed_run(lambda: fetcher(tickers, start, end))
+        rows.append({"Tickers": size, "yf.download s": old_seconds, "Fetcher s": new_seconds,
+                     "Speedup": old_seconds / new_seconds, "yf.download got": old_count, "Fetcher got": new_count})
+
+    print(f"{args.latency:g}s per symbol, {os.cpu_count()} CPUs, {args.fail_rate:.0%} of requests failing")
+    print(pd.DataFrame(rows).round(2).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""Time the data -> RRG -> figure pipeline on synthetic price panels, without network access.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --sizes 10 100 --bars 500 --repeat 3
+
+Each panel is served by a local stub source through the real Fetcher,
+PriceStore and PriceCache (in a temporary directory), then resampled,
+turned into RS-Ratio/RS-Momentum and drawn. Reports the best-of-N wall time
+and peak traced memory per stage, then the memory and numerical drift of
+the compact float32 panel against the float64 frames.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rrg.cache import PriceCache  # noqa: E402
+from rrg.chart import create_large_rrg_chart, create_rrg_chart, figure_payload_size  # noqa: E402
+from rrg.engine import calculate_rrg_panel, to_weekly  # noqa: E402
+from rrg.fetch import Fetcher  # noqa: E402
+from rrg.incremental import RRGBook  # noqa: E402
+from rrg.panel import PricePanel, RRGPanel, drift_check, memory_report  # noqa: E402
+from rrg.profiling import record, stage  # noqa: E402
+from rrg.store import PriceStore  # noqa: E402
+
+# Above this many tickers the WebGL chart is timed instead of the per-ticker one
+LARGE_FIGURE = 100
+
+
+def synthetic_prices(tickers, bars, seed=0):
+    """Geometric random walks on business days ending today, benchmark in column "BENCH"."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars)
+    returns = rng.normal(0.0003, 0.012, size=(bars, tickers + 1))
+    columns = ["BENCH"] + [f"T{i:04d}" for i in range(tickers)]
+    return pd.DataFrame(100 * np.exp(returns.cumsum(axis=0)), index=index, columns=columns)
+
+
+def stub_source(prices):
+    def source(tickers, start, end):
+        return prices.loc[pd.Timestamp(start):pd.Timestamp(end), [t for t in tickers if t in prices.columns]]
+    return source
+
+
+def run_pipeline(prices, tail_length=5):
+    tickers = list(prices.columns[1:])
+    with tempfile.TemporaryDirectory() as root:
+        cache = PriceCache(PriceStore(os.path.join(root, "store")), max_tickers=len(prices.columns))
+        with stage("fetch (stub)"):
+            data = cache.get_panel(list(prices.columns), prices.index[0], prices.index[-1] + pd.Timedelta(days=1),
+                                   Fetcher(stub_source(prices), sleep=lambda s: None))
+        with stage("fetch (cached)"):
+            cache.get_panel(list(prices.columns), prices.index[0], prices.index[-1])
+
+        weekly = to_weekly(data)
+        panel = calculate_rrg_panel(data[tickers], data["BENCH"])
+        RRGPanel.compute(PricePanel.from_frame(data), "BENCH", tickers)
+        book = RRGBook(tail_length=52)
+        book.update(data[tickers], data["BENCH"], "Daily")
+        with stage("rrg tail"):
+            rrg_data = book.tail_panel(tickers, "BENCH", "Daily")
+        if len(tickers) > LARGE_FIGURE:
+            fig = create_large_rrg_chart(rrg_data, "BENCH", tickers, "Benchmark", "Daily", tail_length)
+        else:
+            fig = create_rrg_chart(rrg_data, "BENCH", tickers, {}, "Benchmark", "Daily", tail_length)
+        with stage("serialize"):
+            payload = figure_payload_size(fig)
+    return payload, len(weekly), panel.shape
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Ticker counts")
+    parser.add_argument("--bars", type=int, default=500, help="Daily bars per ticker")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size; the fastest is reported")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no Peak MB column)")
+    args = parser.parse_args(argv)
+
+    # Warm up imports and Plotly's validators so the first size is not charged for them
+    run_pipeline(synthetic_prices(2, 60))
+
+    results = []
+    for size in args.sizes:
+        prices = synthetic_prices(size, args.bars)
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            with record(track_memory=not args.no_memory) as recorder:
+                payload, _, _ = run_pipeline(prices)
+            total = time.perf_counter() - started
+            if best is None or total < best[0]:
+                best = (total, recorder, payload)
+        total, recorder, payload = best
+        table = recorder.as_frame()
+        table.insert(0, "Tickers", size)
+        results.append(table)
+        print(f"{size} tickers x {args.bars} bars: {total:.3f}s total, figure payload {payload / 1024:.0f} KB")
+
+    print()
+    print(pd.concat(results, ignore_index=True).to_string(index=False))
+
+    prices = synthetic_prices(max(args.sizes), args.bars)
+    print()
+    print(f"Compact float32 panel, {max(args.sizes)} tickers x {args.bars} bars")
+    print(memory_report(prices, "BENCH").to_string(index=False))
+    for name, value in drift_check(prices, "BENCH").items():
+        print(f"{name}: {value:.3g}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Time a cold start of the Streamlit app up to its first chart, without network access.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --latency 2 --repeat 5
+
+Every run is a fresh interpreter that imports the app and executes one
+script pass through Streamlit's AppTest with the default selection. Price
+downloads go to a synthetic source that sleeps ``--latency`` seconds per
+call to stand in for Yahoo Finance. Two scenarios are timed: an empty
+store, and a restart where an earlier session left prices and exported
+charts on disk.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+STARTED = time.perf_counter()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "streamlit_RRG.py")
+
+
+def _child(latency):
+    # Runs in the measured interpreter: route downloads to the stub, record when the first chart is emitted
+    sys.path.insert(0, ROOT)
+    import numpy as np
+    import pandas as pd
+
+    import rrg.fetch
+
+    def source(tickers, start, end):
+        time.sleep(latency)
+        index = pd.bdate_range(start, end)
+        closes = {}
+        for ticker in tickers:
+            rng = np.random.default_rng(sum(map(ord, ticker)))
+            closes[ticker] = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        return pd.DataFrame(closes, index=index)
+
+    defaults = rrg.fetch.Fetcher.__init__.__defaults__
+    rrg.fetch.Fetcher.__init__.__defaults__ = (source,) + defaults[1:]
+
+    import streamlit
+    from streamlit.elements.plotly_chart import PlotlyMixin
+    from streamlit.testing.v1 import AppTest
+
+    timings = {"import": time.perf_counter() - STARTED}
+
+    def first_chart(method):
+        def wrapper(*args, **kwargs):
+            timings.setdefault("first chart", time.perf_counter() - STARTED)
+            return method(*args, **kwargs)
+        return wrapper
+
+    streamlit.plotly_chart = first_chart(streamlit.plotly_chart)
+    PlotlyMixin.plotly_chart = first_chart(PlotlyMixin.plotly_chart)
+
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.run()
+    timings["full page"] = time.perf_counter() - STARTED
+    timings["exceptions"] = len(at.exception)
+    print(json.dumps(timings))
+
+
+def cold_start(store, latency):
+    env = dict(os.environ, RRG_STORE_DIR=store, PYTHONHASHSEED="0")
+    output = subprocess.run([sys.executable, __file__, "--child", "--latency", str(latency)], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per stub download call")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median is reported")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        _child(args.latency)
+        return 0
+
+    import pandas as pd
+
+    rows = []
+    for scenario in ("empty store", "restart"):
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as store:
+                if scenario == "restart":
+                    cold_start(store, 0.0)
+                runs.append(cold_start(store, args.latency))
+        frame = pd.DataFrame(runs)
+        if frame["exceptions"].any():
+            print(f"{scenario}: the app raised, timings are not comparable", file=sys.stderr)
+        rows.append({"Scenario": scenario, **frame.drop(columns="exceptions").median().round(3).to_dict()})
+
+    print(f"Cold start to first chart, {args.latency:g}s per download call, median of {args.repeat} (seconds)")
+    print(pd.DataFrame(rows).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,2 @@
+from .engine import (DEFAULT_PARAMS, RRGParams, calculate_rrg_for_timeframe, calculate_rrg_multi, calculate_rrg_panel,
+                     ratio_panel, rrg_from_ratios, to_weekly)
@@ -0,0 +1,236 @@
+"""Backtest quadrant-rotation rules on RRG panels, one config or a whole parameter grid.
+
+    python -m rrg.backtest --universe "US Sectors" --sector XLK --timeframe Weekly
+    python -m rrg.backtest --universe WORLD --ratio-windows 10,26 5,20 --confirm-bars 1 2 3 --workers 4
+
+Positions, turnover and P&L are array operations over the (date x ticker)
+panel. Grid points sharing RRG windows share one RS-Ratio/RS-Momentum
+computation, and groups of them run on a process pool that receives the
+price panel once per worker.
+"""
+import argparse
+import itertools
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .chart import QUADRANTS, quadrant_codes
+from .engine import DEFAULT_PARAMS, RRGParams, ratio_panel, rrg_from_ratios, to_weekly
+
+log = logging.getLogger("rrg.backtest")
+
+# Intraday figures assume about 6.5 trading hours a day
+PERIODS_PER_YEAR = {"Weekly": 52, "Daily": 252, "60m": 252 * 7, "15m": 252 * 26}
+
+# Hold a ticker from the bar it is in one of ``enter`` for ``confirm_bars`` bars in a row until it reaches one of
+# ``exit``; holdings are equally weighted and traded at the close of the signal bar
+BacktestConfig = namedtuple("BacktestConfig", ["params", "enter", "exit", "confirm_bars", "cost_bps"])
+DEFAULT_CONFIG = BacktestConfig(DEFAULT_PARAMS, ("Leading",), ("Weakening", "Lagging"), 1, 0.0)
+
+BacktestResult = namedtuple("BacktestResult", ["weights", "returns", "turnover", "summary"])
+
+
+def _codes(ratios, params):
+    panel = rrg_from_ratios(ratios, params)
+    benchmark = panel.columns.get_level_values(0)[0]
+    return quadrant_codes(panel[benchmark]["RS-Ratio"].to_numpy(), panel[benchmark]["RS-Momentum"].to_numpy())
+
+
+def _in_quadrants(codes, quadrants):
+    # Lookup table over codes -1..3, cheaper than np.isin on large panels
+    table = np.zeros(len(QUADRANTS) + 1, dtype=bool)
+    table[[QUADRANTS.index(q) + 1 for q in quadrants]] = True
+    return table[codes + 1]
+
+
+def _last_true(mask):
+    # Row of the latest True at or above each cell, -1 before the first one
+    rows = np.where(mask, np.arange(len(mask), dtype=np.int32)[:, None], np.int32(-1))
+    return np.maximum.accumulate(rows, axis=0, out=rows)
+
+
+def _positions(codes, config):
+    enter = _in_quadrants(codes, config.enter)
+    exit_ = _in_quadrants(codes, config.exit)
+    if config.confirm_bars > 1:
+        # In an entry quadrant on each of the last confirm_bars bars
+        run = np.cumsum(enter, axis=0, dtype=np.int32)
+        run[config.confirm_bars:] -= run[:-config.confirm_bars].copy()
+        enter = run >= config.confirm_bars
+    # Held while the latest entry signal is more recent than the latest exit
+    return _last_true(enter) > _last_true(exit_ & ~enter)
+
+
+def _evaluate(codes, returns, config, periods_per_year):
+    held = _positions(codes, config)
+    count = held.sum(axis=1)
+    weights = held / np.maximum(count, 1)[:, None]
+    turnover = np.abs(weights).sum(axis=1)
+    turnover[1:] = np.abs(np.diff(weights, axis=0)).sum(axis=1)
+    pnl = np.zeros(len(weights))
+    pnl[1:] = np.einsum("ij,ij->i", weights[:-1], returns[1:])
+    returns = pnl - turnover * config.cost_bps / 10000
+    return weights, returns, turnover, _summary(returns, turnover, count, periods_per_year)
+
+
+def _summary(returns, turnover, holdings, periods_per_year):
+    equity = np.cumprod(1 + returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    volatility = returns.std() * np.sqrt(periods_per_year)
+    return {
+        "Total Return": equity[-1] - 1 if len(equity) else 0.0,
+        "Annual Return": equity[-1] ** (periods_per_year / len(returns)) - 1 if len(returns) else 0.0,
+        "Volatility": volatility,
+        "Sharpe": returns.mean() * periods_per_year / volatility if volatility > 0 else np.nan,
+        "Max Drawdown": drawdown.min() if len(drawdown) else 0.0,
+        "Turnover": turnover.mean() * periods_per_year,
+        "Holdings": holdings.mean(),
+    }
+
+
+def _bar_returns(prices):
+    returns = prices.pct_change(fill_method=None).to_numpy()
+    return np.nan_to_num(returns)
+
+
+def run_backtest(prices, benchmark, config=DEFAULT_CONFIG, periods_per_year=52):
+    """Backtest ``config`` on the bars of ``prices`` (tickers in columns) against ``benchmark``.
+
+    ``benchmark`` is a price Series on the same index. The summary also
+    holds the benchmark's total return over the same bars.
+    """
+    ratios = ratio_panel(prices, benchmark.to_frame())
+    weights, returns, turnover, summary = _evaluate(_codes(ratios, config.params), _bar_returns(prices), config,
+                                                    periods_per_year)
+    summary["Benchmark Return"] = benchmark.iloc[-1] / benchmark.dropna().iloc[0] - 1
+    return BacktestResult(pd.DataFrame(weights, index=prices.index, columns=prices.columns),
+                          pd.Series(returns, index=prices.index), pd.Series(turnover, index=prices.index), summary)
+
+
+def parameter_grid(ratio_windows=(DEFAULT_PARAMS.ratio_windows,), momentum_windows=(DEFAULT_PARAMS.momentum_windows,),
+                   smoothing=(DEFAULT_PARAMS.smoothing,), rules=((DEFAULT_CONFIG.enter, DEFAULT_CONFIG.exit),),
+                   confirm_bars=(1,), cost_bps=(0.0,)):
+    """Every combination of the given settings as ``BacktestConfig``s."""
+    return [BacktestConfig(RRGParams(tuple(r), tuple(m), s), tuple(enter), tuple(exit_), c, cost)
+            for r, m, s, (enter, exit_), c, cost
+            in itertools.product(ratio_windows, momentum_windows, smoothing, rules, confirm_bars, cost_bps)]
+
+
+# Set once per pool worker so the panel is not pickled with every task
+_worker_panel = None
+
+
+def _init_worker(ratios, returns):
+    global _worker_panel
+    _worker_panel = (ratios, returns)
+
+
+def _run_group(params, configs, periods_per_year, panel=None):
+    ratios, returns = panel or _worker_panel
+    started = time.perf_counter()
+    codes = _codes(ratios, params)
+    # The RRG computation is shared by the group, so each point is charged an equal part of it
+    shared = (time.perf_counter() - started) / len(configs)
+    rows = []
+    for config in configs:
+        started = time.perf_counter()
+        summary = _evaluate(codes, returns, config, periods_per_year)[3]
+        summary["Seconds"] = time.perf_counter() - started + shared
+        rows.append(summary)
+    return rows
+
+
+def run_grid(prices, benchmark, configs, periods_per_year=52, max_workers=None):
+    """Summary of every config in ``configs`` as one row each, with its runtime in ``Seconds``.
+
+    Configs are grouped by RRG windows. With ``max_workers`` of 0 or 1, or a
+    single group, everything runs in this process.
+    """
+    ratios = ratio_panel(prices, benchmark.to_frame())
+    returns = _bar_returns(prices)
+    groups = {}
+    for config in configs:
+        groups.setdefault(config.params, []).append(config)
+
+    if max_workers in (0, 1) or len(groups) == 1:
+        results = [_run_group(params, group, periods_per_year, (ratios, returns)) for params, group in groups.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(ratios, returns)) as pool:
+            results = list(pool.map(_run_group, groups, groups.values(), itertools.repeat(periods_per_year)))
+
+    rows = []
+    for group, summaries in zip(groups.values(), results):
+        for config, summary in zip(group, summaries):
+            rows.append({
+                "Ratio Windows": config.params.ratio_windows,
+                "Momentum Windows": config.params.momentum_windows,
+                "Smoothing": config.params.smoothing,
+                "Enter": "/".join(config.enter),
+                "Exit": "/".join(config.exit),
+                "Confirm Bars": config.confirm_bars,
+                "Cost (bps)": config.cost_bps,
+                **summary,
+            })
+    return pd.DataFrame(rows)
+
+
+def _pair(text):
+    short, long = text.split(",")
+    return int(short), int(long)
+
+
+def _rule(text):
+    enter, exit_ = text.split(":")
+    return tuple(enter.split("/")), tuple(exit_.split("/"))
+
+
+def main(argv=None):
+    from .cache import PriceCache
+    from .data import HISTORY_DAYS, load_universe_data
+    from .store import PriceStore
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--universe", default="WORLD")
+    parser.add_argument("--sector")
+    parser.add_argument("--timeframe", default="Weekly", choices=list(HISTORY_DAYS))
+    parser.add_argument("--ratio-windows", nargs="+", type=_pair, default=[DEFAULT_PARAMS.ratio_windows],
+                        help="RS-Ratio short,long windows")
+    parser.add_argument("--momentum-windows", nargs="+", type=_pair, default=[DEFAULT_PARAMS.momentum_windows],
+                        help="RS-Momentum short,long windows")
+    parser.add_argument("--smoothing", nargs="+", default=[DEFAULT_PARAMS.smoothing], choices=["SMA", "EMA"])
+    parser.add_argument("--rule", nargs="+", type=_rule, default=[(DEFAULT_CONFIG.enter, DEFAULT_CONFIG.exit)],
+                        help="Entry and exit quadrants, e.g. Leading:Weakening/Lagging")
+    parser.add_argument("--confirm-bars", nargs="+", type=int, default=[1])
+    parser.add_argument("--cost-bps", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", help="Write the results to this CSV file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    result = load_universe_data(PriceCache(PriceStore()), args.universe, args.sector, args.timeframe)
+    if result.data is None:
+        for level, message in result.messages:
+            log.error(message)
+        return 1
+    data = to_weekly(result.data) if args.timeframe == "Weekly" else result.data
+    configs = parameter_grid(args.ratio_windows, args.momentum_windows, args.smoothing, args.rule,
+                             args.confirm_bars, args.cost_bps)
+    started = time.perf_counter()
+    table = run_grid(data[list(dict.fromkeys(result.sectors))], data[result.benchmark], configs,
+                     PERIODS_PER_YEAR[args.timeframe], args.workers)
+    log.info("%d configs over %d tickers x %d bars in %.2fs", len(configs), len(result.sectors), len(data),
+             time.perf_counter() - started)
+    if args.out:
+        table.to_csv(args.out, index=False)
+    print(table.sort_values("Sharpe", ascending=False).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+"""Precompute RRG snapshots for every built-in universe without Streamlit.
+
+    python -m rrg.batch                       # all universes, both timeframes, once
+    python -m rrg.batch --universe WORLD --timeframe Weekly
+    python -m rrg.batch --every 30            # repeat every 30 minutes
+    python -m rrg.batch --export              # also write chart HTML/JSON/CSV exports
+"""
+import argparse
+import logging
+import time
+
+from .cache import PriceCache
+from .data import HISTORY_DAYS, load_universe_data
+from .engine import calculate_rrg_for_timeframe
+from .export import DEFAULT_EXPORT_DIR, export_rrg
+from .snapshot import DEFAULT_SNAPSHOT_DIR, write_snapshot
+from .store import PriceStore
+from .universes import universe_jobs
+
+log = logging.getLogger("rrg.batch")
+
+
+def run_once(price_cache, jobs, timeframes, root=DEFAULT_SNAPSHOT_DIR, export_root=None, tail_length=5, png=False):
+    written = 0
+    for universe, sector in jobs:
+        for timeframe in timeframes:
+            started = time.perf_counter()
+            result = load_universe_data(price_cache, universe, sector, timeframe)
+            for level, message in result.messages:
+                if level in ("warning", "error"):
+                    log.warning("%s/%s/%s: %s", universe, sector or "-", timeframe, message)
+            if result.data is None:
+                continue
+            rrg_data = calculate_rrg_for_timeframe(result.data, result.benchmark, result.sectors, timeframe)
+            write_snapshot(universe, sector, timeframe, result.data, result.benchmark, result.sectors,
+                           result.sector_names, rrg_data, root)
+            written += 1
+            if export_root:
+                _, rebuilt = export_rrg(universe, sector, timeframe, rrg_data, result.benchmark, result.sectors,
+                                        result.sector_names, tail_length, export_root, png, standalone=True)
+                if not rebuilt:
+                    log.info("%s/%s/%s: export unchanged", universe, sector or "-", timeframe)
+            log.info("%s/%s/%s: %d tickers in %.2fs", universe, sector or "-", timeframe,
+                     len(result.sectors), time.perf_counter() - started)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--universe", action="append", help="Only this universe (repeatable)")
+    parser.add_argument("--timeframe", action="append", choices=list(HISTORY_DAYS), help="Only this timeframe (repeatable)")
+    parser.add_argument("--out", default=DEFAULT_SNAPSHOT_DIR, help="Snapshot directory")
+    parser.add_argument("--every", type=float, help="Repeat every N minutes instead of running once")
+    parser.add_argument("--export", nargs="?", const=DEFAULT_EXPORT_DIR,
+                        help="Also export chart JSON/HTML/CSV, to this directory if given")
+    parser.add_argument("--tail-length", type=int, default=5, help="Tail length of exported charts")
+    parser.add_argument("--png", action="store_true", help="Also export PNG images (needs kaleido)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    jobs = [job for job in universe_jobs() if not args.universe or job[0] in args.universe]
+    timeframes = args.timeframe or list(HISTORY_DAYS)
+    price_cache = PriceCache(PriceStore())
+    while True:
+        written = run_once(price_cache, jobs, timeframes, args.out, args.export, args.tail_length, args.png)
+        log.info("Wrote %d snapshots to %s", written, args.out)
+        if not args.every:
+            return 0
+        time.sleep(args.every * 60)
+        # Drop the in-memory copy so the next round tops up from the store with new bars
+        price_cache.invalidate()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+from .fetch import Fetcher
+
+
+class PriceCache:
+    """Process-wide LRU of daily close series keyed by ticker.
+
+    Every universe and timeframe reads through the same cache, so a symbol
+    shared by two universes (``^GSPC``, ``XLE``, ...) is fetched once. Misses
+    are topped up through ``store`` and only the least recently used tickers
+    are evicted once ``max_tickers`` is exceeded. A ticker being downloaded
+    for one caller (a session or the prefetcher) is waited on by the others
+    instead of being downloaded twice.
+    """
+
+    def __init__(self, store, max_tickers=3000):
+        self.store = store
+        self.max_tickers = max_tickers
+        self._entries = OrderedDict()
+        # ticker -> (start, Future of its series or None) while a download is running
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, ticker, start):
+        entry = self._entries.get(ticker)
+        if entry is None or entry[0] > start:
+            return None
+        self._entries.move_to_end(ticker)
+        return entry[1]
+
+    def _insert(self, ticker, start, series):
+        self._entries[ticker] = (start, series)
+        self._entries.move_to_end(ticker)
+        while len(self._entries) > self.max_tickers:
+            self._entries.popitem(last=False)
+
+    def get_panel(self, tickers, start, end, fetcher=None):
+        """Daily closes for ``tickers`` between ``start`` and ``end``, one column per ticker."""
+        start = pd.Timestamp(start).normalize()
+        tickers = list(dict.fromkeys(tickers))
+        series = {}
+        misses = []
+        owned = {}
+        waiting = {}
+        with self._lock:
+            for ticker in tickers:
+                cached = self._lookup(ticker, start)
+                if cached is not None:
+                    series[ticker] = cached
+                    continue
+                loading = self._loading.get(ticker)
+                if loading is not None and loading[0] <= start:
+                    waiting[ticker] = loading[1]
+                    continue
+                misses.append(ticker)
+                if loading is None:
+                    owned[ticker] = Future()
+                    self._loading[ticker] = (start, owned[ticker])
+
+        if misses:
+            # Downloads run without the lock so other sessions and the prefetcher are not queued behind them
+            try:
+                updated = self.store.update(misses, start, end, fetcher or Fetcher())
+                loaded = {}
+                for ticker in misses:
+                    found = updated[ticker].loc[start:] if ticker in updated else self.store.load(ticker, start)
+                    if found is not None and not found.empty:
+                        loaded[ticker] = found
+            except BaseException as e:
+                self._finish(owned, {}, e)
+                raise
+            with self._lock:
+                for ticker, found in loaded.items():
+                    self._insert(ticker, start, found)
+            self._finish(owned, loaded)
+            series.update(loaded)
+
+        for ticker, future in waiting.items():
+            found = future.result()
+            if found is not None:
+                series[ticker] = found.loc[start:]
+
+        series = {t: s.loc[start:end] for t, s in series.items() if not s.loc[start:end].empty}
+        if not series:
+            return pd.DataFrame()
+        return pd.concat(series, axis=1).sort_index()
+
+    def _finish(self, owned, loaded, error=None):
+        with self._lock:
+            for ticker, future in owned.items():
+                # An invalidation may have detached this download already
+                if self._loading.get(ticker, (None, None))[1] is future:
+                    del self._loading[ticker]
+        for ticker, future in owned.items():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(loaded.get(ticker))
+
+    def invalidate(self, tickers=None):
+        # Downloads in flight are detached too, so the next caller fetches afresh instead of waiting on them
+        with self._lock:
+            if tickers is None:
+                self._entries.clear()
+                self._loading.clear()
+            else:
+                for ticker in tickers:
+                    self._entries.pop(ticker, None)
+                    self._loading.pop(ticker, None)
@@ -0,0 +1,254 @@
+import numpy as np
+
+from .panel import RRGPanel
+from .profiling import timed
+
+CURVE_COLORS = {"Lagging": "red", "Weakening": "orange", "Improving": "darkblue", "Leading": "darkgreen"}
+
+# Cycled through by cluster number in create_cluster_rrg_chart
+CLUSTER_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f",
+                  "#bcbd22", "#17becf"]
+
+# Indexed by the codes returned from quadrant_codes
+QUADRANTS = ["Lagging", "Weakening", "Improving", "Leading"]
+
+# Universes whose members are plain tickers rather than named markets/sectors
+TICKER_UNIVERSES = ("US Sectors", "HK Sub-indexes", "Customised Portfolio", "Index Constituents")
+
+
+def get_quadrant(x, y):
+    if x < 100 and y < 100: return "Lagging"
+    elif x >= 100 and y < 100: return "Weakening"
+    elif x < 100 and y >= 100: return "Improving"
+    else: return "Leading"
+
+
+def quadrant_codes(x, y):
+    """Vectorized get_quadrant: index into QUADRANTS, or -1 where either coordinate is NaN."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    codes = (x >= 100).astype(np.int8) + 2 * (y >= 100).astype(np.int8)
+    return np.where(np.isnan(x) | np.isnan(y), -1, codes)
+
+
+def axis_bounds(rrg_data, padding=0.1):
+    if isinstance(rrg_data, RRGPanel):
+        return rrg_data.axis_bounds(padding)
+    # Consider last 10 data points for boundary calculation
+    rs_ratio = rrg_data["RS-Ratio"].iloc[-10:]
+    rs_momentum = rrg_data["RS-Momentum"].iloc[-10:]
+    min_x = rs_ratio.min().min()
+    max_x = rs_ratio.max().max()
+    min_y = rs_momentum.min().min()
+    max_y = rs_momentum.max().max()
+
+    range_x = max_x - min_x
+    range_y = max_y - min_y
+    min_x = max(min_x - range_x * padding, 70)
+    max_x = min(max_x + range_x * padding, 130)
+    min_y = max(min_y - range_y * padding, 70)
+    max_y = min(max_y + range_y * padding, 130)
+    return min_x, max_x, min_y, max_y
+
+
+def apply_rrg_layout(fig, bounds, benchmark, universe, timeframe):
+    min_x, max_x, min_y, max_y = bounds
+    fig.update_layout(
+        title=f"Relative Rotation Graph (RRG) for {universe} ({timeframe})",
+        xaxis_title="RS-Ratio",
+        yaxis_title="RS-Momentum",
+        width=1200,
+        height=800,
+        xaxis=dict(range=[min_x, max_x], title_font=dict(size=14)),
+        yaxis=dict(range=[min_y, max_y], title_font=dict(size=14)),
+        plot_bgcolor='white',
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=1.02, title=f"Legend<br>Benchmark: {benchmark}"),
+        shapes=[
+            dict(type="rect", xref="x", yref="y", x0=min_x, y0=100, x1=100, y1=max_y, fillcolor="lightblue", opacity=0.35, line_width=0),
+            dict(type="rect", xref="x", yref="y", x0=100, y0=100, x1=max_x, y1=max_y, fillcolor="lightgreen", opacity=0.35, line_width=0),
+            dict(type="rect", xref="x", yref="y", x0=min_x, y0=min_y, x1=100, y1=100, fillcolor="pink", opacity=0.35, line_width=0),
+            dict(type="rect", xref="x", yref="y", x0=100, y0=min_y, x1=max_x, y1=100, fillcolor="lightyellow", opacity=0.35, line_width=0),
+            dict(type="line", xref="x", yref="y", x0=100, y0=min_y, x1=100, y1=max_y, line=dict(color="black", width=1)),
+            dict(type="line", xref="x", yref="y", x0=min_x, y0=100, x1=max_x, y1=100, line=dict(color="black", width=1)),
+        ]
+    )
+
+    label_font = dict(size=32, color='black', family='Arial Black')
+    fig.add_annotation(x=min_x, y=min_y, text="落後", showarrow=False, font=label_font, xanchor="left", yanchor="bottom")
+    fig.add_annotation(x=max_x, y=min_y, text="轉弱", showarrow=False, font=label_font, xanchor="right", yanchor="bottom")
+    fig.add_annotation(x=min_x, y=max_y, text="改善", showarrow=False, font=label_font, xanchor="left", yanchor="top")
+    fig.add_annotation(x=max_x, y=max_y, text="領先", showarrow=False, font=label_font, xanchor="right", yanchor="top")
+    return fig
+
+
+@timed("figure")
+def create_rrg_chart(rrg_data, benchmark, sectors, sector_names, universe, timeframe, tail_length):
+    # Imported on first use, so loading the app does not pay for Plotly before a figure is built
+    import plotly.graph_objects as go
+
+    rs_ratio = rrg_data["RS-Ratio"]
+    rs_momentum = rrg_data["RS-Momentum"]
+
+    fig = go.Figure()
+
+    for sector in sectors:
+        x_values = rs_ratio[sector].iloc[-tail_length:].dropna()
+        y_values = rs_momentum[sector].iloc[-tail_length:].dropna()
+        if len(x_values) > 0 and len(y_values) > 0:
+            current_quadrant = get_quadrant(x_values.iloc[-1], y_values.iloc[-1])
+            color = CURVE_COLORS[current_quadrant]
+            
+            if universe == "FX":
+                legend_label = f"{sector} ({sector_names.get(sector, '')})"
+                chart_label = sector_names.get(sector, sector)
+            elif universe in TICKER_UNIVERSES:
+                legend_label = sector
+                chart_label = sector.replace('.HK', '')
+            else:
+                legend_label = f"{sector} ({sector_names.get(sector, '')})"
+                chart_label = f"{sector_names.get(sector, sector)}"
+            
+            fig.add_trace(go.Scatter(
+                x=x_values, y=y_values, mode='lines+markers', name=legend_label,
+                line=dict(color=color, width=2), marker=dict(size=6, symbol='circle'),
+                legendgroup=sector, showlegend=True
+            ))
+            
+            # Determine text position based on momentum comparison
+            if len(y_values) > 1:
+                current_momentum = y_values.iloc[-1]
+                last_momentum = y_values.iloc[-2]
+                text_position = "top center" if current_momentum > last_momentum else "bottom center"
+            else:
+                text_position = "top center"
+            
+            # Add only the latest point as a larger marker with text
+            fig.add_trace(go.Scatter(
+                x=[x_values.iloc[-1]], y=[y_values.iloc[-1]], mode='markers+text',
+                name=f"{sector} (latest)", marker=dict(color=color, size=12, symbol='circle'),
+                text=[chart_label], textposition=text_position, legendgroup=sector, showlegend=False,
+                textfont=dict(color='black', size=12, family='Arial Black')
+            ))
+
+    return apply_rrg_layout(fig, axis_bounds(rrg_data), benchmark, universe, timeframe)
+
+
+def _tail_arrays(rrg_data, sectors, tail_length):
+    tickers = list(dict.fromkeys(sectors))
+    if isinstance(rrg_data, RRGPanel):
+        x, y = rrg_data.tail(tail_length, tickers)
+        return tickers, x.astype(float), y.astype(float)
+    x = rrg_data["RS-Ratio"][tickers].iloc[-tail_length:].to_numpy()
+    y = rrg_data["RS-Momentum"][tickers].iloc[-tail_length:].to_numpy()
+    return tickers, x, y
+
+
+def _latest_points(x, y):
+    # Last non-NaN row of every column
+    valid = ~(np.isnan(x) | np.isnan(y))
+    has_data = valid.any(axis=0)
+    last = np.where(has_data, x.shape[0] - 1 - np.argmax(valid[::-1], axis=0), 0)
+    columns = np.arange(x.shape[1])
+    return x[last, columns], y[last, columns], has_data
+
+
+@timed("figure")
+def create_large_rrg_chart(rrg_data, benchmark, sectors, universe, timeframe, tail_length):
+    """RRG for hundreds or thousands of tickers with a constant number of WebGL traces.
+
+    Tails are grouped by current quadrant into one ``Scattergl`` line trace
+    each, separated by NaN gaps; latest points share a single marker trace
+    and ticker names are shown on hover instead of as labels.
+    """
+    import plotly.graph_objects as go
+
+    tickers, x, y = _tail_arrays(rrg_data, sectors, tail_length)
+    head_x, head_y, has_data = _latest_points(x, y)
+    quadrants = np.array(QUADRANTS + [None], dtype=object)[quadrant_codes(head_x, head_y)]
+
+    fig = go.Figure()
+    # One NaN row after each tail breaks the line between tickers
+    gap = np.full((1, x.shape[1]), np.nan)
+    for quadrant, color in CURVE_COLORS.items():
+        members = np.flatnonzero(quadrants == quadrant)
+        if len(members) == 0:
+            continue
+        tail_x = np.vstack([x[:, members], gap[:, :len(members)]]).T.ravel()
+        tail_y = np.vstack([y[:, members], gap[:, :len(members)]]).T.ravel()
+        names = np.repeat(np.array(tickers, dtype=object)[members], x.shape[0] + 1)
+        fig.add_trace(go.Scattergl(
+            x=tail_x, y=tail_y, mode='lines', name=f"{quadrant} ({len(members)})",
+            line=dict(color=color, width=1), opacity=0.6, hovertext=names, hoverinfo='text',
+            legendgroup=quadrant, connectgaps=False
+        ))
+
+    colors = [CURVE_COLORS[q] if q else "grey" for q in quadrants]
+    fig.add_trace(go.Scattergl(
+        x=head_x[has_data], y=head_y[has_data], mode='markers', name="Latest",
+        marker=dict(color=np.array(colors)[has_data], size=7, symbol='circle'),
+        hovertext=np.array(tickers, dtype=object)[has_data], hoverinfo='text', showlegend=False
+    ))
+    return apply_rrg_layout(fig, axis_bounds(rrg_data), benchmark, universe, timeframe)
+
+
+@timed("figure")
+def create_cluster_rrg_chart(rrg_data, benchmark, sectors, labels, universe, timeframe, tail_length, members=True):
+    """RRG with one colour and one centroid tail per cluster of ``labels`` (ticker -> cluster number).
+
+    The centroid is the mean RS-Ratio/RS-Momentum of a cluster's members on
+    each bar of the tail. With ``members`` the member tails are drawn thin
+    in the cluster colour, one ``Scattergl`` trace per cluster; without it
+    only the centroids are shown.
+    """
+    import plotly.graph_objects as go
+
+    tickers, x, y = _tail_arrays(rrg_data, [s for s in sectors if s in labels.index], tail_length)
+    clusters = labels[tickers].to_numpy()
+
+    fig = go.Figure()
+    gap = np.full((1, x.shape[1]), np.nan)
+    with np.errstate(invalid='ignore'):
+        for i, cluster in enumerate(np.unique(clusters)):
+            color = CLUSTER_COLORS[i % len(CLUSTER_COLORS)]
+            group = np.flatnonzero(clusters == cluster)
+            name = f"Cluster {cluster} ({len(group)})"
+            if members:
+                names = np.repeat(np.array(tickers, dtype=object)[group], x.shape[0] + 1)
+                fig.add_trace(go.Scattergl(
+                    x=np.vstack([x[:, group], gap[:, :len(group)]]).T.ravel(),
+                    y=np.vstack([y[:, group], gap[:, :len(group)]]).T.ravel(),
+                    mode='lines', name=f"{name} members", line=dict(color=color, width=1), opacity=0.35,
+                    hovertext=names, hoverinfo='text', legendgroup=name, showlegend=False, connectgaps=False
+                ))
+            centre_x = np.nanmean(x[:, group], axis=1)
+            centre_y = np.nanmean(y[:, group], axis=1)
+            fig.add_trace(go.Scatter(
+                x=centre_x, y=centre_y, mode='lines+markers', name=name, legendgroup=name,
+                line=dict(color=color, width=3), marker=dict(size=6, symbol='circle')
+            ))
+            fig.add_trace(go.Scatter(
+                x=centre_x[-1:], y=centre_y[-1:], mode='markers+text', name=f"{name} (latest)",
+                marker=dict(color=color, size=14, symbol='diamond'), text=[f"C{cluster}"],
+                textposition="top center", legendgroup=name, showlegend=False,
+                textfont=dict(color='black', size=12, family='Arial Black')
+            ))
+    return apply_rrg_layout(fig, axis_bounds(rrg_data), benchmark, universe, timeframe)
+
+
+def top_movers(rrg_data, sectors, tail_length, top_n):
+    """The ``top_n`` tickers per current quadrant that travelled furthest over the tail."""
+    tickers, x, y = _tail_arrays(rrg_data, sectors, tail_length)
+    head_x, head_y, _ = _latest_points(x, y)
+    codes = quadrant_codes(head_x, head_y)
+    path = np.nansum(np.hypot(np.diff(x, axis=0), np.diff(y, axis=0)), axis=0)
+    selected = []
+    for code in range(len(QUADRANTS)):
+        members = np.flatnonzero(codes == code)
+        # Stable sort keeps ticker order among equal paths
+        selected.extend(members[np.argsort(-path[members], kind='stable')][:top_n])
+    return [tickers[i] for i in sorted(selected)]
+
+
+def figure_payload_size(fig):
+    """Size in bytes of the JSON sent to the browser for ``fig``."""
+    return len(fig.to_json().encode("utf-8"))
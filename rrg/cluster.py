@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .profiling import timed
+
+SHRINKAGE_METHODS = ("None", "Ledoit-Wolf")
+
+# ``labels`` maps each ticker to its cluster, numbered from 1 by decreasing size
+ClusterResult = namedtuple("ClusterResult", ["labels", "correlation", "shrinkage"])
+
+
+class ClusterError(Exception):
+    pass
+
+
+def _standardized_returns(prices, window):
+    returns = np.log(prices.to_numpy(dtype=np.float64))
+    returns = np.diff(returns[-(window + 1):], axis=0)
+    valid = np.isfinite(returns)
+    count = valid.sum(axis=0)
+    mean = np.where(valid, returns, 0.0).sum(axis=0) / np.maximum(count, 1)
+    centred = np.where(valid, returns - mean, 0.0)
+    std = np.sqrt((centred ** 2).sum(axis=0) / np.maximum(count - 1, 1))
+    # Flat or empty columns stay all-zero and end up uncorrelated with everything
+    return np.divide(centred, std, out=np.zeros_like(centred), where=std > 0), valid
+
+
+def _ledoit_wolf(z, corr):
+    # Intensity of shrinking towards the identity, as in Ledoit & Wolf (2004) on standardized returns
+    n, p = z.shape
+    mu = np.trace(corr) / p
+    delta = ((corr - mu * np.eye(p)) ** 2).sum() / p
+    if delta <= 0:
+        return 0.0
+    z2 = z ** 2
+    beta = ((z2.T @ z2).sum() / n - (corr ** 2).sum()) / (p * n)
+    return float(min(beta, delta) / delta)
+
+
+def return_correlation(prices, window=120, shrinkage=0.0):
+    """Correlation of log returns over the last ``window`` bars, columns of ``prices`` on both axes.
+
+    Returns are standardized per ticker and each pair is scaled by the
+    number of bars where both have a return, so the whole matrix is two
+    matrix products instead of per-pair loops. ``shrinkage`` blends the
+    matrix towards the identity: a weight in [0, 1], or ``"Ledoit-Wolf"``
+    for the estimated optimal weight. Returns ``(frame, weight)``.
+    """
+    z, valid = _standardized_returns(prices, window)
+    mask = valid.astype(np.float64)
+    corr = (z.T @ z) / np.maximum(mask.T @ mask - 1, 1)
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, 1.0)
+    if shrinkage == "Ledoit-Wolf":
+        shrinkage = _ledoit_wolf(z, corr)
+    elif shrinkage in (None, "None"):
+        shrinkage = 0.0
+    if shrinkage:
+        corr *= 1 - shrinkage
+        corr[np.diag_indices_from(corr)] += shrinkage
+    return pd.DataFrame(corr, index=prices.columns, columns=prices.columns), float(shrinkage)
+
+
+@timed("cluster")
+def cluster_tickers(prices, n_clusters=8, window=120, shrinkage=0.0, method="average"):
+    """Group the columns of ``prices`` into at most ``n_clusters`` by hierarchical clustering of their correlation.
+
+    Distances are ``sqrt((1 - rho) / 2)``, so perfectly correlated tickers
+    are 0 apart and opposite ones 1. Needs scipy.
+    """
+    try:
+        from scipy.cluster.hierarchy import fcluster, linkage
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        raise ClusterError("Correlation clustering needs the scipy package.")
+
+    prices = prices.loc[:, ~prices.columns.duplicated()]
+    correlation, weight = return_correlation(prices, window, shrinkage)
+    if len(prices.columns) < 2:
+        return ClusterResult(pd.Series(1, index=prices.columns), correlation, weight)
+    distance = np.sqrt(np.clip((1 - correlation.to_numpy()) / 2, 0, 1))
+    tree = linkage(squareform(distance, checks=False), method=method)
+    labels = fcluster(tree, t=min(n_clusters, len(prices.columns)), criterion="maxclust")
+    # Renumber so cluster 1 is the largest; ties keep the order fcluster found them in
+    sizes = np.bincount(labels)
+    order = np.argsort(-sizes[1:], kind="stable") + 1
+    renumber = np.empty(len(sizes), dtype=int)
+    renumber[order] = np.arange(1, len(order) + 1)
+    return ClusterResult(pd.Series(renumber[labels], index=prices.columns), correlation, weight)
+
+
+def cluster_members(labels):
+    """One row per cluster: its size and member tickers."""
+    groups = labels.groupby(labels, sort=True)
+    return pd.DataFrame({
+        "Cluster": list(groups.groups),
+        "Size": groups.size().to_numpy(),
+        "Tickers": [", ".join(group.index) for _, group in groups],
+    })
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+# Outcomes returned by Coordinator.run
+HIT, MISS, COALESCED = "hit", "miss", "coalesced"
+
+
+class Coordinator:
+    """Process-wide memo of fetch and compute results that runs each distinct request once.
+
+    Keys are tuples whose first items name the request and its scope, e.g.
+    ``("data", universe, sector, timeframe, ...)``. A finished result is
+    served to every later caller until it is invalidated or evicted (least
+    recently used beyond ``max_entries``); callers arriving while the same
+    key is running wait for that run instead of starting their own.
+    Failures are passed to every waiter and not kept.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._running = {}
+        self._counts = {}
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def _count(self, kind, outcome, seconds=0.0):
+        self._counts[kind, outcome] = self._counts.get((kind, outcome), 0) + 1
+        self._seconds[kind, outcome] = self._seconds.get((kind, outcome), 0.0) + seconds
+
+    def run(self, key, func, *args, **kwargs):
+        """``func(*args, **kwargs)`` memoized under ``key``; returns ``(result, outcome)``."""
+        kind = key[0]
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self._count(kind, HIT)
+                return self._results[key], HIT
+            future = self._running.get(key)
+            owner = future is None
+            if owner:
+                future = self._running[key] = Future()
+
+        started = time.perf_counter()
+        if not owner:
+            try:
+                return future.result(), COALESCED
+            finally:
+                with self._lock:
+                    self._count(kind, COALESCED, time.perf_counter() - started)
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._release(key, future)
+                self._count(kind, "error", time.perf_counter() - started)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            current = self._release(key, future)
+            self._count(kind, MISS, time.perf_counter() - started)
+            # Invalidated while running: hand the result to the waiters but do not keep it
+            if current:
+                self._results[key] = result
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        future.set_result(result)
+        return result, MISS
+
+    def _release(self, key, future):
+        # Called with the lock held; False when an invalidation detached this run
+        if self._running.get(key) is future:
+            del self._running[key]
+            return True
+        return False
+
+    def invalidate(self, match=None):
+        """Drop results whose key satisfies ``match(key)``, or all of them; returns how many were dropped.
+
+        Runs in flight under a matching key are detached: their callers still
+        get the old result, but the next caller starts a fresh run.
+        """
+        with self._lock:
+            keys = [key for key in list(self._results) + list(self._running) if match is None or match(key)]
+            for key in keys:
+                self._results.pop(key, None)
+                self._running.pop(key, None)
+            return len(keys)
+
+    def metrics(self):
+        """Calls and seconds per request kind and outcome (hit, miss, coalesced, error)."""
+        with self._lock:
+            rows = [(kind, outcome, count, self._seconds[kind, outcome])
+                    for (kind, outcome), count in sorted(self._counts.items())]
+        return pd.DataFrame(rows, columns=["Request", "Outcome", "Calls", "Seconds"])
@@ -0,0 +1,109 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .fetch import Fetcher
+from .intraday import INTRADAY_MINUTES
+from .profiling import stage
+from .universes import UniverseError, resolve_universe
+
+# Daily history kept for every ticker; weekly bars are resampled from it
+HISTORY_DAYS = {"Weekly": 7 * 100, "Daily": 500}
+
+# Longer ticker lists are cut short in messages
+MAX_LISTED_TICKERS = 30
+
+# ``messages`` holds (level, text) pairs, level being one of "info", "success", "warning", "error"
+UniverseData = namedtuple("UniverseData", ["data", "benchmark", "sectors", "sector_names", "messages"])
+
+
+def load_universe_data(price_cache, universe, sector, timeframe, custom_tickers=None, custom_benchmark=None,
+                       end_date=None, extra_benchmarks=(), intraday_feed=None):
+    """Daily closes for a universe selection, read through ``price_cache``.
+
+    Nothing is displayed here; progress and problems are returned in
+    ``messages`` for the caller to show or log. ``data`` is None on failure.
+    ``extra_benchmarks`` are loaded into ``data`` alongside the main one.
+    Intraday timeframes are read from ``intraday_feed`` instead of the cache.
+    """
+    messages = []
+    try:
+        benchmark, sectors, sector_names = resolve_universe(universe, sector, custom_tickers, custom_benchmark)
+    except UniverseError as e:
+        return UniverseData(None, None, None, None, [("error", str(e))])
+
+    end_date = end_date or datetime.now()
+    intraday = timeframe in INTRADAY_MINUTES
+    start_date = None if intraday else end_date - timedelta(days=HISTORY_DAYS[timeframe])
+    # Always request the longest window so every timeframe shares one cached daily series
+    fetch_start_date = end_date - timedelta(days=max(HISTORY_DAYS.values()))
+
+    def failed(message):
+        messages.append(("error", message))
+        return UniverseData(None, benchmark, sectors, sector_names, messages)
+
+    try:
+        tickers_to_download = list(dict.fromkeys([benchmark, *extra_benchmarks] + sectors))
+        shown = ', '.join(tickers_to_download[:MAX_LISTED_TICKERS])
+        if len(tickers_to_download) > MAX_LISTED_TICKERS:
+            shown += f" and {len(tickers_to_download) - MAX_LISTED_TICKERS} more"
+        messages.append(("info", f"Attempting to download data for: {shown}"))
+
+        if intraday:
+            # The feed only fetches bars newer than its buffer, at most once per refresh interval
+            with stage("fetch"):
+                resolved = intraday_feed.refresh(tickers_to_download, end_date)
+                data = intraday_feed.get_panel(tickers_to_download, timeframe)
+        else:
+            # Tickers already cached by any universe are reused; the rest only fetch bars newer than the disk store
+            fetcher = Fetcher()
+            with stage("fetch"):
+                data = price_cache.get_panel(tickers_to_download, fetch_start_date, end_date, fetcher)
+            resolved = fetcher.resolved
+        for ticker, alias in resolved.items():
+            messages.append(("success", f"Successfully downloaded {alias} as a proxy for {ticker}"))
+        if data.empty:
+            return failed("No data available for the selected universe and sector.")
+        data = data.loc[start_date:]
+
+        # Check the actual date range of the downloaded data
+        actual_start_date = data.index.min()
+        actual_end_date = data.index.max()
+
+        messages.append(("info", f"Data available from {actual_start_date.date()} to {actual_end_date.date()}"))
+
+        if actual_end_date.date() < end_date.date() - timedelta(days=1):
+            messages.append(("warning", f"The most recent data available is from {actual_end_date.date()}. "
+                                        f"This may be due to market holidays or delays in data updates."))
+
+        missing_tickers = set(tickers_to_download) - set(data.columns)
+        if missing_tickers:
+            shown = ', '.join(sorted(missing_tickers)[:MAX_LISTED_TICKERS])
+            if len(missing_tickers) > MAX_LISTED_TICKERS:
+                shown += f" and {len(missing_tickers) - MAX_LISTED_TICKERS} more"
+            messages.append(("warning", f"The following tickers could not be downloaded: {shown}"))
+
+            for missing_ticker in missing_tickers:
+                data[missing_ticker] = pd.Series(index=data.index, dtype='float64')
+
+        if data.empty:
+            return failed("No data available for the selected universe and sector.")
+
+        data = data.dropna(axis=1, how='all')
+
+        if benchmark not in data.columns:
+            return failed(f"No data available for the benchmark {benchmark}. Please choose a different benchmark.")
+
+        valid_sectors = [s for s in sectors if s in data.columns]
+        if len(valid_sectors) == 0:
+            return failed("No valid sector data available. Please check your input and try again.")
+
+        sectors = valid_sectors
+        sector_names = {s: sector_names[s] for s in valid_sectors if s in sector_names}
+
+    except Exception as e:
+        return failed(f"Error fetching data: {str(e)}")
+
+    messages.append(("success", f"Successfully downloaded data for {len(data.columns)} tickers."))
+    return UniverseData(data, benchmark, sectors, sector_names, messages)
@@ -0,0 +1,94 @@
+from collections import namedtuple
+
+import pandas as pd
+
+from .profiling import timed
+
+RS_RATIO_WINDOWS = (10, 26)
+RS_MOMENTUM_WINDOWS = (1, 4)
+SMOOTHING_METHODS = ("SMA", "EMA")
+
+# Short/long window pairs for RS-Ratio and RS-Momentum and the moving average used for both
+RRGParams = namedtuple("RRGParams", ["ratio_windows", "momentum_windows", "smoothing"])
+DEFAULT_PARAMS = RRGParams(RS_RATIO_WINDOWS, RS_MOMENTUM_WINDOWS, "SMA")
+
+
+def _smooth(frame, window, smoothing):
+    if smoothing == "EMA":
+        return frame.ewm(span=window, adjust=False, min_periods=window).mean()
+    return frame.rolling(window=window).mean()
+
+
+def _rrg_from_ratio(sbr, params=DEFAULT_PARAMS):
+    (ratio_short, ratio_long), (momentum_short, momentum_long), smoothing = params
+    rs1 = _smooth(sbr, ratio_short, smoothing)
+    rs2 = _smooth(sbr, ratio_long, smoothing)
+    rs = 100 * ((rs1 - rs2) / rs2 + 1)
+    rm1 = _smooth(rs, momentum_short, smoothing)
+    rm2 = _smooth(rs, momentum_long, smoothing)
+    rm = 100 * ((rm1 - rm2) / rm2 + 1)
+    return rs, rm
+
+
+def ratio_panel(prices, benchmarks):
+    """Price ratios of every column of ``prices`` to every column of ``benchmarks``.
+
+    A single broadcast division of the (date x ticker) panel by the
+    (date x benchmark) panel, with ``(benchmark, ticker)`` columns. It only
+    depends on prices, so it can be kept per data load and fed to
+    ``rrg_from_ratios`` for any window settings.
+    """
+    ratios = prices.to_numpy(dtype=float)[:, None, :] / benchmarks.to_numpy(dtype=float)[:, :, None]
+    columns = pd.MultiIndex.from_product([benchmarks.columns, prices.columns])
+    return pd.DataFrame(ratios.reshape(len(prices), -1), index=prices.index, columns=columns)
+
+
+@timed("rrg")
+def rrg_from_ratios(ratios, params=DEFAULT_PARAMS):
+    """RRG of a ``ratio_panel``, with ``(benchmark, field, ticker)`` columns."""
+    rs, rm = _rrg_from_ratio(ratios, params)
+    return pd.concat({"RS-Ratio": rs, "RS-Momentum": rm}, axis=1).reorder_levels([1, 0, 2], axis=1).sort_index(
+        axis=1, level=0, sort_remaining=False)
+
+
+@timed("rrg")
+def calculate_rrg_panel(prices, benchmark, params=DEFAULT_PARAMS):
+    """RS-Ratio and RS-Momentum for every column of ``prices`` against ``benchmark``.
+
+    ``benchmark`` is either a column name of ``prices`` or a price Series on the
+    same index. Returns a frame with ``(field, ticker)`` MultiIndex columns, so
+    ``panel["RS-Ratio"]`` is a dates x tickers frame.
+    """
+    if not isinstance(benchmark, pd.Series):
+        benchmark = prices[benchmark]
+
+    rs, rm = _rrg_from_ratio(prices.div(benchmark, axis=0), params)
+    return pd.concat({"RS-Ratio": rs, "RS-Momentum": rm}, axis=1)
+
+
+@timed("rrg multi-benchmark")
+def calculate_rrg_multi(prices, benchmarks, params=DEFAULT_PARAMS):
+    """RRG of every column of ``prices`` against every column of ``benchmarks`` in one pass.
+
+    Returns a frame with ``(benchmark, field, ticker)`` columns, so
+    ``multi[name]`` has the layout of ``calculate_rrg_panel``.
+    """
+    return rrg_from_ratios(ratio_panel(prices, benchmarks), params)
+
+
+@timed("resample")
+def to_weekly(prices):
+    """Weekly bars (Friday close) derived from a daily price frame."""
+    return prices.resample('W-FRI').last()
+
+
+def calculate_rrg_for_timeframe(data, benchmark, sectors, timeframe, params=DEFAULT_PARAMS):
+    """Full-history RRG panel of ``sectors`` on the bars of ``timeframe`` ("Weekly" or "Daily").
+
+    With a list of benchmarks the result has the ``calculate_rrg_multi`` layout.
+    """
+    data_resampled = to_weekly(data) if timeframe == "Weekly" else data
+    tickers = list(dict.fromkeys(sectors))
+    if isinstance(benchmark, (list, tuple)):
+        return calculate_rrg_multi(data_resampled[tickers], data_resampled[list(benchmark)], params)
+    return calculate_rrg_panel(data_resampled[tickers], data_resampled[benchmark], params)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .chart import create_large_rrg_chart, create_rrg_chart
+from .snapshot import snapshot_key
+from .store import DEFAULT_STORE_DIR
+
+DEFAULT_EXPORT_DIR = os.environ.get("RRG_EXPORT_DIR", os.path.join(DEFAULT_STORE_DIR, "exports"))
+
+# Above this many tickers the exported figure uses the WebGL layout
+LARGE_EXPORT = 60
+
+# Bump when the artifact layout changes so old exports are rebuilt
+EXPORT_VERSION = 2
+
+# Artifacts no longer in the manifest are kept this long (seconds) for sessions still reading them
+EXPORT_KEEP_SECONDS = 3600
+
+
+def export_hash(rrg_data, benchmark, sectors, sector_names, universe, timeframe, tail_length):
+    """Content hash of everything the exported chart is drawn from.
+
+    Only the values the chart reads are hashed: the RS-Ratio/RS-Momentum
+    of ``sectors`` over the tail and the last 10 bars used for the axis
+    bounds. They go through float32 and are rounded to 1e-4, so the float64
+    batch panel, the float32 snapshot and the live incremental tail of the
+    same data map to the same key; new history further back does not force
+    a rebuild.
+    """
+    tickers = list(dict.fromkeys(sectors))
+    rows = rrg_data.iloc[-max(tail_length, 10):]
+    values = np.hstack([rows["RS-Ratio"].reindex(columns=tickers).to_numpy(dtype=np.float64),
+                        rows["RS-Momentum"].reindex(columns=tickers).to_numpy(dtype=np.float64)])
+    values = np.round(values.astype(np.float32).astype(np.float64), 4)
+    digest = hashlib.sha256()
+    digest.update(pd.DatetimeIndex(rows.index).as_unit("ns").asi8.tobytes())
+    digest.update(np.ascontiguousarray(values).tobytes())
+    digest.update(json.dumps([EXPORT_VERSION, benchmark, list(sectors), sector_names, universe, timeframe,
+                              tail_length], ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def coordinates_frame(rrg_data, sectors, tail_length):
+    """Tail coordinates in long form: one (Date, Ticker, RS-Ratio, RS-Momentum) row per point."""
+    tickers = list(dict.fromkeys(sectors))
+    rows = rrg_data.iloc[-tail_length:]
+    frame = pd.concat({"RS-Ratio": rows["RS-Ratio"][tickers].stack(),
+                       "RS-Momentum": rows["RS-Momentum"][tickers].stack()}, axis=1)
+    frame.index.names = ["Date", "Ticker"]
+    return frame.reset_index()
+
+
+def _write(path, content, mode="w"):
+    # Unique temp name per writer: two sessions may export the same selection at once
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _collect_garbage(directory, keep_prefix, max_age=EXPORT_KEEP_SECONDS):
+    # Old artifact sets are removed by age, never on the request path, so a session that read the previous
+    # manifest can still open its files
+    now = time.time()
+    for name in os.listdir(directory):
+        if name == "manifest.json" or name.startswith(keep_prefix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _export_dir(root, universe, sector, timeframe, tail_length):
+    return os.path.join(root, f"{snapshot_key(universe, sector, timeframe)}__{tail_length}")
+
+
+def load_export(universe, sector, timeframe, tail_length, root=DEFAULT_EXPORT_DIR):
+    """Manifest of the latest export of a selection, or None. Artifact paths are absolute."""
+    directory = _export_dir(root, universe, sector, timeframe, tail_length)
+    try:
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    manifest["files"] = {kind: os.path.join(directory, name) for kind, name in manifest["files"].items()}
+    if not all(os.path.exists(path) for path in manifest["files"].values()):
+        return None
+    return manifest
+
+
+def read_figure(manifest):
+    """The exported figure as a plain dict, ready for ``st.plotly_chart``."""
+    with open(manifest["files"]["json"], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def export_rrg(universe, sector, timeframe, rrg_data, benchmark, sectors, sector_names, tail_length,
+               root=DEFAULT_EXPORT_DIR, png=False, force=False, standalone=False):
+    """Write figure JSON, HTML and tail coordinates CSV of one selection.
+
+    The HTML loads plotly.js from its CDN unless ``standalone``, which
+    inlines the ~3.5 MB library for offline use; that is meant for
+    ``python -m rrg.batch --export``, not for every request of the app.
+
+    Artifacts are named after ``export_hash`` and a ``manifest.json`` points
+    at the current set; when the hash is unchanged nothing is rebuilt.
+    Superseded sets are deleted once older than ``EXPORT_KEEP_SECONDS``. The
+    PNG needs the optional kaleido package and is skipped without it.
+    Returns ``(manifest, rebuilt)``.
+    """
+    import plotly.io as pio
+
+    key = export_hash(rrg_data, benchmark, sectors, sector_names, universe, timeframe, tail_length)
+    existing = load_export(universe, sector, timeframe, tail_length, root)
+    if (not force and existing is not None and existing["hash"] == key and (not png or "png" in existing["files"])
+            and (existing.get("standalone", False) or not standalone)):
+        return existing, False
+
+    directory = _export_dir(root, universe, sector, timeframe, tail_length)
+    os.makedirs(directory, exist_ok=True)
+    if existing is not None:
+        # The replaced set ages from now, not from when it was written
+        for path in existing["files"].values():
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+    if len(sectors) > LARGE_EXPORT:
+        fig = create_large_rrg_chart(rrg_data, benchmark, sectors, universe, timeframe, tail_length)
+    else:
+        fig = create_rrg_chart(rrg_data, benchmark, sectors, sector_names, universe, timeframe, tail_length)
+
+    prefix = key[:16]
+    files = {"json": f"{prefix}.json", "html": f"{prefix}.html", "csv": f"{prefix}.csv"}
+    _write(os.path.join(directory, files["json"]), fig.to_json())
+    html = pio.to_html(fig, include_plotlyjs=True if standalone else "cdn", full_html=True)
+    _write(os.path.join(directory, files["html"]), html)
+    _write(os.path.join(directory, files["csv"]), coordinates_frame(rrg_data, sectors, tail_length).to_csv(index=False))
+    if png:
+        try:
+            _write(os.path.join(directory, f"{prefix}.png"), fig.to_image(format="png"), "wb")
+            files["png"] = f"{prefix}.png"
+        except (ImportError, ValueError):
+            pass
+
+    manifest = {
+        "hash": key,
+        "universe": universe,
+        "sector": sector,
+        "timeframe": timeframe,
+        "tail_length": tail_length,
+        "standalone": standalone,
+        "generated_at": time.time(),
+        "last_date": pd.Timestamp(rrg_data.index.max()).isoformat(),
+        "files": files,
+    }
+    # Manifest goes last so readers never see it pointing at missing files
+    _write(os.path.join(directory, "manifest.json"), json.dumps(manifest, ensure_ascii=False, indent=1))
+    _collect_garbage(directory, prefix)
+    return load_export(universe, sector, timeframe, tail_length, root), True
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Stand-ins tried in order when a ticker returns no data; results are stored under the original ticker
+FALLBACK_ALIASES = {
+    "^TWII": ["TAIEX"],
+    "3032.HK": ["^HSTECH"],
+}
+
+
+# yf.download(threads=True) uses two threads per CPU; downloads are I/O bound, so the Fetcher goes wider
+DEFAULT_WORKERS = max(16, 2 * (os.cpu_count() or 1))
+
+
+def close_frame(tickers, symbol_close):
+    """One column per ticker from ``symbol_close(ticker)``, skipping symbols that fail or return nothing.
+
+    A failing symbol (e.g. a rate-limit error) only drops that symbol, so
+    the caller retries it alone instead of the whole batch. Raises the last
+    error only when every symbol failed.
+    """
+    closes = {}
+    error = None
+    for ticker in tickers:
+        try:
+            close = symbol_close(ticker)
+        except Exception as e:
+            error = e
+            continue
+        if close is not None and not close.empty:
+            closes[ticker] = close
+    if not closes and error is not None:
+        raise error
+    return pd.DataFrame(closes)
+
+
+def download_close(tickers, start, end):
+    """Daily closes for ``tickers`` from Yahoo Finance, one column per ticker.
+
+    Uses one ``Ticker.history`` call per symbol rather than ``yf.download``,
+    whose module-level result dict is not safe to share between threads.
+    """
+    import yfinance as yf
+
+    def symbol_close(ticker):
+        history = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=True)
+        if history.empty:
+            return None
+        close = history['Close']
+        if close.index.tz is not None:
+            close.index = close.index.tz_localize(None)
+        close.index = close.index.normalize()
+        return close[~close.index.duplicated(keep='last')]
+
+    return close_frame(tickers, symbol_close)
+
+
+def _has_data(frame, ticker):
+    return ticker in frame.columns and frame[ticker].notna().any()
+
+
+class Fetcher:
+    """Batched, concurrent wrapper around a ``source(tickers, start, end)`` callable.
+
+    Tickers are split into small batches fetched on a bounded thread pool,
+    so up to ``max_workers`` symbols download at once. Calls that fail as a
+    whole are retried with exponential backoff, tickers a batch came back
+    without (the source skips symbols that fail on their own) are retried
+    alone, and anything still missing is looked up through ``aliases``. Instances are callable with the same signature as the
+    source, so they can be passed straight to ``PriceStore.update``.
+    """
+
+    def __init__(self, source=download_close, batch_size=10, max_workers=DEFAULT_WORKERS, retries=2, backoff=1.0,
+                 aliases=FALLBACK_ALIASES, sleep=time.sleep):
+        self.source = source
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.aliases = aliases
+        self.sleep = sleep
+        self.resolved = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def _call(self, tickers, start, end):
+        for attempt in range(self.retries + 1):
+            try:
+                return self.source(tickers, start, end)
+            except Exception as e:
+                if attempt == self.retries:
+                    with self._lock:
+                        for ticker in tickers:
+                            self.errors[ticker] = str(e)
+                    return pd.DataFrame()
+                self.sleep(self.backoff * 2 ** attempt)
+
+    def _fetch_single(self, ticker, start, end):
+        frame = self._call([ticker], start, end)
+        if _has_data(frame, ticker):
+            return frame[ticker]
+        for alias in self.aliases.get(ticker, []):
+            frame = self._call([alias], start, end)
+            if _has_data(frame, alias):
+                with self._lock:
+                    self.resolved[ticker] = alias
+                return frame[alias].rename(ticker)
+        return None
+
+    def __call__(self, tickers, start, end):
+        tickers = list(dict.fromkeys(tickers))
+        batches = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            frames = list(pool.map(lambda batch: self._call(batch, start, end), batches))
+            columns = {}
+            for frame in frames:
+                for ticker in frame.columns:
+                    if ticker in tickers and _has_data(frame, ticker):
+                        columns[ticker] = frame[ticker]
+
+            missing = [ticker for ticker in tickers if ticker not in columns]
+            for ticker, series in zip(missing, pool.map(lambda t: self._fetch_single(t, start, end), missing)):
+                if series is not None:
+                    columns[ticker] = series
+
+        if not columns:
+            return pd.DataFrame()
+        return pd.DataFrame(columns)[[t for t in tickers if t in columns]]
@@ -0,0 +1,277 @@
+import math
+import os
+import pickle
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from .engine import RS_MOMENTUM_WINDOWS, RS_RATIO_WINDOWS, calculate_rrg_panel
+from .profiling import timed
+
+DEFAULT_TAIL = 52
+
+
+def _mean(window, length):
+    # Same convention as pandas rolling(length).mean(): NaN until full, NaN if any value is NaN
+    if len(window) < length:
+        return math.nan
+    total = math.fsum(window)
+    return total / length if not math.isnan(total) else math.nan
+
+
+def _same(a, b):
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+# Relative difference between a stored and a recomputed price ratio that means the prices were re-adjusted
+READJUST_TOLERANCE = 1e-4
+
+
+def _readjusted(calc, dates, ratios):
+    # The ratio of the finished bar before the last one no longer matches the prices: a split or dividend
+    # re-adjusted the history, so the running state is stale
+    if calc.last_date is None or len(calc.ratios) < 2:
+        return False
+    row = np.searchsorted(dates, calc.last_date)
+    if row == 0 or row >= len(dates) or dates[row] != calc.last_date:
+        return False
+    stored, current = calc.ratios[-2], ratios[row - 1]
+    return not (_same(stored, current) or math.isclose(stored, current, rel_tol=READJUST_TOLERANCE))
+
+
+class IncrementalRRG:
+    """Running RS-Ratio/RS-Momentum state for one ticker against one benchmark.
+
+    Only the last 26 price ratios and last 4 RS-Ratio values are kept, so each
+    new bar costs a constant amount of work regardless of history length.
+    Pushing a bar with the same date as the last one revises that bar, which
+    covers an intraday refresh of a session that is still open. Dates are
+    kept as nanosecond integers.
+    """
+
+    def __init__(self, tail_length=DEFAULT_TAIL):
+        self.ratios = deque(maxlen=max(RS_RATIO_WINDOWS))
+        self.ratio_values = deque(maxlen=max(RS_MOMENTUM_WINDOWS))
+        self.tail = deque(maxlen=tail_length)
+        self.last_date = None
+        self._previous = None
+
+    def _state(self):
+        return (deque(self.ratios, self.ratios.maxlen), deque(self.ratio_values, self.ratio_values.maxlen),
+                deque(self.tail, self.tail.maxlen), self.last_date)
+
+    def _restore(self, state):
+        self.ratios, self.ratio_values, self.tail, self.last_date = state
+
+    def update(self, date, price, benchmark_price):
+        date = pd.Timestamp(date).value
+        if self.last_date is not None and date < self.last_date:
+            return self.latest()
+        if self.last_date is not None and date == self.last_date:
+            self._restore(self._previous)
+        self._previous = self._state()
+
+        self.ratios.append(price / benchmark_price)
+        rs1 = _mean(list(self.ratios)[-RS_RATIO_WINDOWS[0]:], RS_RATIO_WINDOWS[0])
+        rs2 = _mean(self.ratios, RS_RATIO_WINDOWS[1])
+        rs = 100 * ((rs1 - rs2) / rs2 + 1)
+
+        self.ratio_values.append(rs)
+        rm1 = _mean(list(self.ratio_values)[-RS_MOMENTUM_WINDOWS[0]:], RS_MOMENTUM_WINDOWS[0])
+        rm2 = _mean(self.ratio_values, RS_MOMENTUM_WINDOWS[1])
+        rm = 100 * ((rm1 - rm2) / rm2 + 1)
+
+        self.tail.append((date, rs, rm))
+        self.last_date = date
+        return rs, rm
+
+    def latest(self):
+        if not self.tail:
+            return math.nan, math.nan
+        return self.tail[-1][1], self.tail[-1][2]
+
+    @classmethod
+    def _seeded(cls, dates, ratio, rs_ratio, rs_momentum, tail_length):
+        calc = cls(tail_length)
+        calc.ratios.extend(ratio[-calc.ratios.maxlen:].tolist())
+        calc.ratio_values.extend(rs_ratio[-calc.ratio_values.maxlen:].tolist())
+        calc.tail.extend(zip(dates[-tail_length:].tolist(), rs_ratio[-tail_length:].tolist(),
+                             rs_momentum[-tail_length:].tolist()))
+        calc.last_date = int(dates[-1]) if len(dates) else None
+        return calc
+
+    @classmethod
+    def from_history(cls, dates, ratio, rs_ratio, rs_momentum, tail_length=DEFAULT_TAIL):
+        """Seed the state from full-history arrays computed by ``calculate_rrg_panel``.
+
+        ``dates`` are nanosecond integers (``DatetimeIndex.as_unit("ns").asi8``).
+        """
+        calc = cls._seeded(dates, ratio, rs_ratio, rs_momentum, tail_length)
+        # State as of the bar before, so the seeded last bar can still be revised
+        calc._previous = cls._seeded(dates[:-1], ratio[:-1], rs_ratio[:-1], rs_momentum[:-1], tail_length)._state()
+        return calc
+
+    def to_dict(self):
+        previous = self._previous or self._state()
+        return {
+            "tail_length": self.tail.maxlen,
+            "current": [list(part) if isinstance(part, deque) else part for part in self._state()],
+            "previous": [list(part) if isinstance(part, deque) else part for part in previous],
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        calc = cls(state["tail_length"])
+
+        def restored(saved):
+            ratios, ratio_values, tail, last_date = saved
+            return (deque(ratios, calc.ratios.maxlen), deque(ratio_values, calc.ratio_values.maxlen),
+                    deque(map(tuple, tail), calc.tail.maxlen), last_date)
+
+        calc._restore(restored(state["current"]))
+        calc._previous = restored(state["previous"])
+        return calc
+
+
+class RRGBook:
+    """Incremental RRG calculators keyed by (ticker, benchmark, scope), saved as one pickle per scope.
+
+    ``scope`` is normally the timeframe; callers whose bar calendar depends on
+    the rest of the universe (daily bars across markets) should include the
+    universe in it as well, and user-built lists their set of columns. ``path`` is a directory; a scope's file is read
+    the first time the scope is used and ``save`` only rewrites scopes that
+    changed since the last save. At most ``max_calculators`` are kept, the
+    least recently used are dropped first (like ``PriceCache``), so many
+    uploaded lists or intraday scopes do not grow the book without bound.
+    """
+
+    def __init__(self, path=None, tail_length=DEFAULT_TAIL, max_calculators=20000):
+        self.path = path
+        self.tail_length = tail_length
+        self.max_calculators = max_calculators
+        self.calculators = OrderedDict()
+        self._loaded = set()
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _scope_path(self, scope):
+        return os.path.join(self.path, quote(scope, safe="") + ".pkl")
+
+    def _load_scope(self, scope):
+        # Called with the lock held
+        if scope in self._loaded:
+            return
+        self._loaded.add(scope)
+        if not self.path or not os.path.exists(self._scope_path(scope)):
+            return
+        try:
+            with open(self._scope_path(scope), "rb") as f:
+                saved = pickle.load(f)
+            for key, state in saved.items():
+                self.calculators.setdefault(key, IncrementalRRG.from_dict(state))
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, ValueError):
+            # A stale or damaged scope is only a cache; it is rebuilt from prices
+            pass
+        self._evict()
+
+    def _evict(self):
+        while len(self.calculators) > self.max_calculators:
+            self.calculators.popitem(last=False)
+
+    def _get(self, key):
+        calc = self.calculators.get(key)
+        if calc is not None:
+            self.calculators.move_to_end(key)
+        return calc
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            scopes = {scope: {} for scope in self._dirty}
+            for key, calc in self.calculators.items():
+                if key[2] in scopes:
+                    scopes[key[2]][key] = calc.to_dict()
+            self._dirty = set()
+        os.makedirs(self.path, exist_ok=True)
+        for scope, state in scopes.items():
+            path = self._scope_path(scope)
+            tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    @timed("rrg incremental")
+    def update(self, prices, benchmark, scope):
+        """Feed the bars of ``prices`` not seen yet; returns the number of bars applied.
+
+        Tickers without state, or whose prices were re-adjusted since it was
+        built, are seeded from the whole history in one vectorized pass; the
+        rest only process bars from their last date on.
+        """
+        benchmark_name = benchmark.name
+        dates = prices.index.as_unit("ns").asi8
+        values = prices.to_numpy(dtype=float)
+        benchmark_values = benchmark.to_numpy(dtype=float)
+        columns = list(prices.columns)
+        applied = 0
+        with self._lock:
+            self._load_scope(scope)
+            ratios = values / benchmark_values[:, None]
+            known = {i: self._get((t, benchmark_name, scope)) for i, t in enumerate(columns)}
+            new = [i for i, calc in known.items() if calc is None or _readjusted(calc, dates, ratios[:, i])]
+            if new:
+                new_prices = prices.iloc[:, new]
+                panel = calculate_rrg_panel(new_prices, benchmark)
+                ratio = ratios[:, new]
+                rs_ratio = panel["RS-Ratio"].to_numpy()
+                rs_momentum = panel["RS-Momentum"].to_numpy()
+                for j, i in enumerate(new):
+                    self.calculators[(columns[i], benchmark_name, scope)] = IncrementalRRG.from_history(
+                        dates, ratio[:, j], rs_ratio[:, j], rs_momentum[:, j], self.tail_length)
+                applied += len(new)
+
+            new = set(new)
+            for i, ticker in enumerate(columns):
+                if i in new:
+                    continue
+                calc = known[i]
+                first = 0 if calc.last_date is None else np.searchsorted(dates, calc.last_date)
+                for row in range(first, len(dates)):
+                    ratio = values[row, i] / benchmark_values[row]
+                    if dates[row] == calc.last_date and _same(ratio, calc.ratios[-1]):
+                        continue
+                    calc.update(dates[row], values[row, i], benchmark_values[row])
+                    applied += 1
+            if applied:
+                self._dirty.add(scope)
+            self._evict()
+        return applied
+
+    def tail_panel(self, tickers, benchmark, scope):
+        """Latest tail of every ticker in the ``(field, ticker)`` layout of ``calculate_rrg_panel``."""
+        tails = {}
+        with self._lock:
+            self._load_scope(scope)
+            calcs = [(ticker, self._get((ticker, benchmark, scope))) for ticker in tickers]
+        for ticker, calc in calcs:
+            if calc is not None and calc.tail:
+                dates, x, y = zip(*calc.tail)
+                tails[ticker] = (np.array(dates, dtype="int64"), np.array(x, dtype=float), np.array(y, dtype=float))
+
+        all_dates = np.unique(np.concatenate([tail[0] for tail in tails.values()])) if tails else np.array([], dtype="int64")
+        ratio = np.full((len(all_dates), len(tails)), np.nan)
+        momentum = np.full((len(all_dates), len(tails)), np.nan)
+        for j, (dates, x, y) in enumerate(tails.values()):
+            rows = np.searchsorted(all_dates, dates)
+            ratio[rows, j] = x
+            momentum[rows, j] = y
+
+        index = pd.DatetimeIndex(all_dates.astype("datetime64[ns]"))
+        return pd.concat({
+            "RS-Ratio": pd.DataFrame(ratio, index=index, columns=list(tails)),
+            "RS-Momentum": pd.DataFrame(momentum, index=index, columns=list(tails)),
+        }, axis=1)
@@ -0,0 +1,218 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .fetch import Fetcher, close_frame
+
+# Bar length in minutes of each intraday timeframe; all of them are aggregated from BASE_MINUTES bars
+INTRADAY_MINUTES = {"60m": 60, "15m": 15}
+BASE_MINUTES = 15
+
+# Yahoo Finance only serves 15-minute bars for the last 60 days
+INTRADAY_HISTORY_DAYS = 59
+
+
+def download_intraday(tickers, start, end, interval=f"{BASE_MINUTES}m"):
+    """Intraday closes for ``tickers`` on naive UTC timestamps, one column per ticker.
+
+    UTC rather than exchange-local time, so bars of different markets that
+    share a row were taken at the same moment.
+    """
+    import yfinance as yf
+
+    def symbol_close(ticker):
+        history = yf.Ticker(ticker).history(start=start, end=end, interval=interval, auto_adjust=True)
+        if history.empty:
+            return None
+        close = history['Close']
+        if close.index.tz is not None:
+            close.index = close.index.tz_convert("UTC").tz_localize(None)
+        return close[~close.index.duplicated(keep='last')]
+
+    return close_frame(tickers, symbol_close)
+
+
+class _Ring:
+    __slots__ = ("times", "closes", "start", "size")
+
+    def __init__(self, capacity):
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.closes = np.full(capacity, np.nan)
+        self.start = 0
+        self.size = 0
+
+    def ordered(self):
+        index = (self.start + np.arange(self.size)) % len(self.times)
+        return self.times[index], self.closes[index]
+
+
+class BarBuffer:
+    """Fixed number of ``minutes`` bars per ticker, kept in ring buffers.
+
+    Ticks and bars are floored to their bar; a price in the latest bar
+    revises its close, a price in a later bar appends one and, once
+    ``capacity`` bars are held, overwrites the oldest. Prices older than the
+    latest bar are ignored, so memory never grows past ``capacity`` bars.
+    ``version`` goes up with every change, so callers can tell whether a
+    panel built earlier is still current.
+    """
+
+    def __init__(self, minutes=BASE_MINUTES, capacity=1200):
+        self.minutes = minutes
+        self.capacity = capacity
+        self._step = minutes * 60 * 10 ** 9
+        self._rings = {}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, ticker):
+        return ticker in self._rings
+
+    def _ring(self, ticker):
+        ring = self._rings.get(ticker)
+        if ring is None:
+            ring = self._rings[ticker] = _Ring(self.capacity)
+        return ring
+
+    def last_time(self, ticker):
+        ring = self._rings.get(ticker)
+        if ring is None or ring.size == 0:
+            return None
+        return pd.Timestamp(int(ring.times[(ring.start + ring.size - 1) % self.capacity]))
+
+    def append(self, ticker, timestamp, price):
+        """Add one tick or bar close; returns False when it is older than the latest bar."""
+        stamp = pd.Timestamp(timestamp).as_unit("ns").value
+        bucket = stamp - stamp % self._step
+        with self._lock:
+            ring = self._ring(ticker)
+            if ring.size:
+                last = (ring.start + ring.size - 1) % self.capacity
+                if bucket == ring.times[last]:
+                    ring.closes[last] = price
+                    self.version += 1
+                    return True
+                if bucket < ring.times[last]:
+                    return False
+            slot = (ring.start + ring.size) % self.capacity
+            ring.times[slot] = bucket
+            ring.closes[slot] = price
+            if ring.size < self.capacity:
+                ring.size += 1
+            else:
+                ring.start = (ring.start + 1) % self.capacity
+            self.version += 1
+            return True
+
+    def extend(self, ticker, closes):
+        """Merge a close Series into the buffer in one step; bars already held are revised."""
+        closes = closes.dropna()
+        if closes.empty:
+            return
+        stamps = pd.DatetimeIndex(closes.index).as_unit("ns").asi8
+        new = pd.Series(closes.to_numpy(dtype=float), index=stamps - stamps % self._step)
+        with self._lock:
+            ring = self._ring(ticker)
+            times, values = ring.ordered()
+            merged = pd.concat([pd.Series(values, index=times), new])
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index().iloc[-self.capacity:]
+            ring.times[:len(merged)] = merged.index
+            ring.closes[:len(merged)] = merged.to_numpy()
+            ring.start = 0
+            ring.size = len(merged)
+            self.version += 1
+
+    def series(self, ticker):
+        with self._lock:
+            ring = self._rings.get(ticker)
+            if ring is None:
+                return pd.Series(dtype=float)
+            times, closes = ring.ordered()
+        return pd.Series(closes, index=pd.DatetimeIndex(times.astype("datetime64[ns]")), name=ticker)
+
+    def panel(self, tickers, minutes=None):
+        """Closes of ``tickers`` on ``minutes`` bars aggregated from the buffered ones."""
+        series = {t: self.series(t) for t in dict.fromkeys(tickers) if t in self._rings}
+        series = {t: s for t, s in series.items() if not s.empty}
+        if not series:
+            return pd.DataFrame()
+        panel = pd.concat(series, axis=1).sort_index()
+        minutes = minutes or self.minutes
+        if minutes != self.minutes:
+            panel = panel.resample(f"{minutes}min").last()
+        return panel.dropna(how='all')
+
+    def memory_bytes(self):
+        return sum(ring.times.nbytes + ring.closes.nbytes for ring in self._rings.values())
+
+
+class IntradayFeed:
+    """Process-wide intraday bars topped up from ``source`` at most every ``refresh_seconds``.
+
+    A ticker seen for the first time is backfilled with ``history_days`` of
+    bars; afterwards only bars since its latest buffered one are requested.
+    ``source`` has the ``download_close`` signature, so a recorded feed can
+    stand in for Yahoo Finance, and ``replay`` pushes ticks straight into the
+    buffer.
+    """
+
+    def __init__(self, source=download_intraday, capacity=1200, refresh_seconds=60,
+                 history_days=INTRADAY_HISTORY_DAYS, clock=time.time):
+        self.buffer = BarBuffer(BASE_MINUTES, capacity)
+        self.source = source
+        self.refresh_seconds = refresh_seconds
+        self.history_days = history_days
+        self.clock = clock
+        self._refreshed = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, tickers, end=None, force=False):
+        """Fetch new bars for tickers whose last refresh is older than ``refresh_seconds``."""
+        end = end or datetime.now()
+        now = self.clock()
+        with self._lock:
+            stale = [t for t in dict.fromkeys(tickers)
+                     if force or now - self._refreshed.get(t, -np.inf) >= self.refresh_seconds]
+            # Group by fetch start so new tickers are backfilled and known ones only fetch the latest bars
+            groups = {}
+            for ticker in stale:
+                last = self.buffer.last_time(ticker)
+                start = last.normalize() if last is not None else end - timedelta(days=self.history_days)
+                groups.setdefault(start, []).append(ticker)
+            fetcher = Fetcher(source=self.source)
+            for start, group in groups.items():
+                frame = fetcher(group, start, end + timedelta(days=1))
+                for ticker in frame.columns:
+                    self.buffer.extend(ticker, frame[ticker])
+            for ticker in stale:
+                self._refreshed[ticker] = now
+        return fetcher.resolved
+
+    def invalidate(self, tickers=None):
+        """Make the next ``refresh`` fetch ``tickers`` (all by default) regardless of the interval."""
+        with self._lock:
+            if tickers is None:
+                self._refreshed.clear()
+            else:
+                for ticker in tickers:
+                    self._refreshed.pop(ticker, None)
+
+    def replay(self, ticks):
+        """Push ``(timestamp, ticker, price)`` ticks into the buffer; returns how many were applied."""
+        return sum(self.buffer.append(ticker, timestamp, price) for timestamp, ticker, price in ticks)
+
+    def get_panel(self, tickers, timeframe):
+        """Closes of ``tickers`` on the bars of ``timeframe`` ("60m" or "15m")."""
+        return self.buffer.panel(tickers, INTRADAY_MINUTES[timeframe])
+
+
+def read_ticks(path):
+    """``(timestamp, ticker, price)`` ticks from a CSV with those columns, in time order.
+
+    Naive timestamps are taken as UTC, like the bars from ``download_intraday``.
+    """
+    ticks = pd.read_csv(path, parse_dates=["timestamp"]).sort_values("timestamp", kind="stable")
+    return ticks[["timestamp", "ticker", "price"]].itertuples(index=False, name=None)
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from .engine import DEFAULT_PARAMS, calculate_rrg_panel
+from .profiling import timed
+
+
+class PricePanel:
+    """Prices as one C-contiguous (date x ticker) float32 array with date and ticker indexes.
+
+    Columns are addressed by position; ``position`` maps a ticker to its
+    column once, so computations never look columns up by name.
+    """
+
+    __slots__ = ("values", "dates", "tickers", "_positions")
+
+    def __init__(self, values, dates, tickers):
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = tuple(tickers)
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frame(cls, frame):
+        return cls(frame.to_numpy(dtype=np.float32), frame.index, frame.columns)
+
+    def to_frame(self):
+        return pd.DataFrame(self.values, index=self.dates, columns=list(self.tickers))
+
+    def position(self, tickers):
+        return np.array([self._positions[t] for t in tickers], dtype=np.intp)
+
+    def column(self, ticker):
+        return self.values[:, self._positions[ticker]]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.dates.nbytes
+
+
+def _rolling_mean(values, window):
+    # Same convention as pandas rolling(window).mean(): NaN until full and wherever the window holds a NaN.
+    # Sums run in float64 so long histories do not accumulate float32 rounding.
+    missing = np.isnan(values)
+    sums = np.cumsum(np.where(missing, 0.0, values), axis=0, dtype=np.float64)
+    gaps = np.cumsum(missing, axis=0, dtype=np.int32)
+    sums[window:] -= sums[:-window].copy()
+    gaps[window:] -= gaps[:-window].copy()
+    mean = sums / window
+    mean[(gaps > 0) | (np.arange(len(values)) < window - 1)[:, None]] = np.nan
+    return mean
+
+
+class RRGPanel:
+    """RS-Ratio and RS-Momentum of a ``PricePanel`` as float32 (date x ticker) arrays."""
+
+    __slots__ = ("ratio", "momentum", "dates", "tickers", "_positions")
+
+    def __init__(self, ratio, momentum, dates, tickers):
+        self.ratio = np.ascontiguousarray(ratio, dtype=np.float32)
+        self.momentum = np.ascontiguousarray(momentum, dtype=np.float32)
+        self.dates = dates
+        self.tickers = tuple(tickers)
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    @timed("rrg compact")
+    def compute(cls, prices, benchmark, tickers=None, params=DEFAULT_PARAMS):
+        """RRG of ``tickers`` (all but ``benchmark`` by default) from a ``PricePanel``.
+
+        The simple moving average runs on the arrays directly; EMA smoothing
+        goes through the pandas engine and is stored as float32.
+        """
+        tickers = [t for t in prices.tickers if t != benchmark] if tickers is None else list(dict.fromkeys(tickers))
+        values = prices.values[:, prices.position(tickers)]
+        bench = prices.column(benchmark)[:, None]
+        if params.smoothing != "SMA":
+            frame = calculate_rrg_panel(pd.DataFrame(values.astype(np.float64), index=prices.dates, columns=tickers),
+                                        pd.Series(bench[:, 0].astype(np.float64), index=prices.dates), params)
+            return cls(frame["RS-Ratio"].to_numpy(), frame["RS-Momentum"].to_numpy(), prices.dates, tickers)
+
+        (ratio_short, ratio_long), (momentum_short, momentum_long), _ = params
+        sbr = values.astype(np.float64) / bench
+        with np.errstate(invalid='ignore', divide='ignore'):
+            long_mean = _rolling_mean(sbr, ratio_long)
+            rs = 100 * ((_rolling_mean(sbr, ratio_short) - long_mean) / long_mean + 1)
+            long_rs = _rolling_mean(rs, momentum_long)
+            rm = 100 * ((_rolling_mean(rs, momentum_short) - long_rs) / long_rs + 1)
+        return cls(rs, rm, prices.dates, tickers)
+
+    @property
+    def nbytes(self):
+        return self.ratio.nbytes + self.momentum.nbytes + self.dates.nbytes
+
+    def position(self, tickers):
+        return np.array([self._positions[t] for t in tickers], dtype=np.intp)
+
+    def tail(self, tail_length, tickers=None):
+        if tickers is None:
+            return self.ratio[-tail_length:], self.momentum[-tail_length:]
+        columns = self.position(tickers)
+        return self.ratio[-tail_length:, columns], self.momentum[-tail_length:, columns]
+
+    def axis_bounds(self, padding=0.1):
+        """Same bounds as ``chart.axis_bounds`` on the last 10 rows, computed on the arrays."""
+        x, y = self.tail(10)
+        min_x, max_x = float(np.nanmin(x)), float(np.nanmax(x))
+        min_y, max_y = float(np.nanmin(y)), float(np.nanmax(y))
+        range_x = max_x - min_x
+        range_y = max_y - min_y
+        return (max(min_x - range_x * padding, 70), min(max_x + range_x * padding, 130),
+                max(min_y - range_y * padding, 70), min(max_y + range_y * padding, 130))
+
+    def to_frame(self):
+        """The ``(field, ticker)`` frame used by the chart and screener code."""
+        columns = pd.MultiIndex.from_product([["RS-Ratio", "RS-Momentum"], list(self.tickers)])
+        return pd.DataFrame(np.hstack([self.ratio, self.momentum]), index=self.dates, columns=columns)
+
+
+def memory_report(prices, benchmark, tickers=None):
+    """Bytes held by the float64 frames and by the compact float32 panels for the same data."""
+    tickers = [t for t in prices.columns if t != benchmark] if tickers is None else list(dict.fromkeys(tickers))
+    frame_rrg = calculate_rrg_panel(prices[tickers], prices[benchmark])
+    panel = PricePanel.from_frame(prices)
+    compact_rrg = RRGPanel.compute(panel, benchmark, tickers)
+    rows = [
+        ("Prices", prices.memory_usage(deep=True).sum(), panel.nbytes),
+        ("RRG", frame_rrg.memory_usage(deep=True).sum(), compact_rrg.nbytes),
+    ]
+    report = pd.DataFrame(rows, columns=["Data", "float64 frame MB", "float32 panel MB"])
+    report[["float64 frame MB", "float32 panel MB"]] /= 1024 ** 2
+    report["Ratio"] = report["float64 frame MB"] / report["float32 panel MB"]
+    return report
+
+
+def drift_check(prices, benchmark, tickers=None, params=DEFAULT_PARAMS):
+    """Largest differences between the float32 panel and the float64 pandas path.
+
+    Reports the maximum absolute RS-Ratio and RS-Momentum differences and
+    how many latest points land in a different quadrant.
+    """
+    from .chart import quadrant_codes
+
+    tickers = [t for t in prices.columns if t != benchmark] if tickers is None else list(dict.fromkeys(tickers))
+    reference = calculate_rrg_panel(prices[tickers], prices[benchmark], params)
+    compact = RRGPanel.compute(PricePanel.from_frame(prices), benchmark, tickers, params)
+    ratio = reference["RS-Ratio"].to_numpy()
+    momentum = reference["RS-Momentum"].to_numpy()
+    return {
+        "RS-Ratio max abs diff": float(np.nanmax(np.abs(compact.ratio - ratio))),
+        "RS-Momentum max abs diff": float(np.nanmax(np.abs(compact.momentum - momentum))),
+        "NaN mismatches": int((np.isnan(compact.ratio) != np.isnan(ratio)).sum()
+                              + (np.isnan(compact.momentum) != np.isnan(momentum)).sum()),
+        "Quadrant changes": int((quadrant_codes(compact.ratio[-1], compact.momentum[-1])
+                                 != quadrant_codes(ratio[-1], momentum[-1])).sum()),
+    }
@@ -0,0 +1,201 @@
+import csv
+import io
+import ipaddress
+import logging
+import os
+import socket
+import threading
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+import pandas as pd
+
+log = logging.getLogger("rrg.portfolio")
+
+# Header cells skipped when a ticker file has a title row
+_HEADER_NAMES = {"ticker", "tickers", "symbol", "symbols", "code", "stock"}
+
+PRESET_PORTFOLIO_URL = "https://raw.githubusercontent.com/jasonckb/RRG-Dashboard/main/Customised%20Portfolio.txt"
+
+EXCEL_SUFFIXES = (".xlsx", ".xls")
+
+
+class PortfolioError(Exception):
+    pass
+
+
+def parse_ticker_list(text):
+    """Tickers from one-per-line text or the first column of a CSV, in file order without duplicates."""
+    tickers = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row:
+            continue
+        ticker = row[0].strip()
+        if ticker and ticker.lower() not in _HEADER_NAMES:
+            tickers.append(ticker)
+    return list(dict.fromkeys(tickers))
+
+
+def normalize_tickers(tickers):
+    """Apply the sidebar ticker rules to a whole list at once, keeping the first of any duplicates.
+
+    Letters only are upper-cased (``aapl`` -> ``AAPL``), digits only become
+    Hong Kong codes (``700`` -> ``0700.HK``) and anything else is kept as
+    typed. Blank entries are dropped.
+    """
+    raw = pd.Series(list(tickers), dtype=object).astype(str).str.strip()
+    raw = raw[raw != ""]
+    normalized = raw.where(~raw.str.isalpha(), raw.str.upper())
+    normalized = normalized.where(~raw.str.isdigit(), raw.str.zfill(4) + ".HK")
+    return normalized.drop_duplicates().tolist()
+
+
+def read_tickers(data, name=""):
+    """Normalized tickers from the bytes of a ticker file.
+
+    Workbooks (``.xlsx``/``.xls``, needs openpyxl) are read from the first
+    column of their first sheet, anything else as text or CSV.
+    """
+    if name.lower().endswith(EXCEL_SUFFIXES):
+        try:
+            column = pd.read_excel(io.BytesIO(data), header=None, usecols=[0], dtype=str).iloc[:, 0]
+        except ImportError as e:
+            raise PortfolioError(f"Reading {name} needs the openpyxl package: {e}")
+        except ValueError as e:
+            raise PortfolioError(f"Could not read {name}: {e}")
+        cells = column.dropna().str.strip()
+        tickers = cells[~cells.str.lower().isin(_HEADER_NAMES)]
+    else:
+        tickers = parse_ticker_list(data.decode("utf-8-sig"))
+    return normalize_tickers(tickers)
+
+
+def _local_path(source):
+    parsed = urlparse(source)
+    if parsed.scheme == "file":
+        return url2pathname(parsed.path)
+    if parsed.scheme in ("http", "https"):
+        return None
+    return source
+
+
+def _check_public_host(source):
+    # Every address the host resolves to must be public, so viewers cannot reach services next to the server
+    host = urlparse(source).hostname
+    if not host:
+        raise PortfolioError(f"Not a valid URL: {source}")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except (OSError, UnicodeError) as e:
+        raise PortfolioError(f"Cannot resolve {host}: {e}")
+    if not all(ipaddress.ip_address(address.split("%")[0]).is_global for address in addresses):
+        raise PortfolioError(f"Portfolios can only be fetched from public hosts, not {host}.")
+
+
+class PortfolioLoader:
+    """Ticker lists read from local files or URLs, cached until their source changes.
+
+    ``source`` is a path, a ``file://`` URL or an http(s) URL. Files are
+    re-read only when their modification time or size changes; URLs are
+    re-requested with the cached ``ETag``/``Last-Modified`` so an unchanged
+    file costs a 304 and no parsing. If a URL cannot be reached, the last
+    list read from it is returned. Lists come back normalized and
+    deduplicated (see ``normalize_tickers``).
+
+    With ``restricted`` (for sources typed by app viewers) only http(s)
+    URLs of public hosts are fetched, without following redirects, and
+    local files only when they resolve inside ``base_dir``; relative names
+    are taken from there. Without ``base_dir`` no local file is read.
+    """
+
+    def __init__(self, timeout=10, base_dir=None, restricted=False):
+        self.timeout = timeout
+        self.base_dir = base_dir
+        self.restricted = restricted
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key, validator):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and (validator is None or entry[0] == validator):
+            return list(entry[1])
+        return None
+
+    def _store(self, key, validator, tickers):
+        with self._lock:
+            self._entries[key] = (validator, tickers)
+        return list(tickers)
+
+    def load(self, source):
+        path = _local_path(source)
+        if path is not None:
+            if self.restricted:
+                if urlparse(source).scheme not in ("", "file"):
+                    raise PortfolioError("Enter an http(s) URL or upload a file.")
+                path = self._allowed_path(path)
+            return self._load_file(source, path)
+        if self.restricted:
+            _check_public_host(source)
+        return self._load_url(source)
+
+    def _allowed_path(self, path):
+        if not self.base_dir:
+            raise PortfolioError("Enter an http(s) URL or upload a file.")
+        base = os.path.realpath(self.base_dir)
+        resolved = os.path.realpath(os.path.join(base, path))
+        if os.path.commonpath([base, resolved]) != base:
+            raise PortfolioError(f"Only files in the portfolio folder can be loaded, not {path}.")
+        return resolved
+
+    def parse(self, data, name=""):
+        """``read_tickers`` of uploaded bytes, cached by their content so reruns skip the parsing."""
+        key = ("upload", name, hash(data))
+        cached = self._cached(key, None)
+        return cached if cached is not None else self._store(key, None, read_tickers(data, name))
+
+    def _load_file(self, source, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            raise PortfolioError(f"Cannot read portfolio file {path}: {e}")
+        validator = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cached(source, validator)
+        if cached is not None:
+            return cached
+        with open(path, "rb") as f:
+            return self._store(source, validator, read_tickers(f.read(), path))
+
+    def _load_url(self, source):
+        try:
+            import requests
+        except ImportError:
+            raise PortfolioError("The 'requests' library is not installed. Please install it to fetch portfolios from a URL.")
+
+        with self._lock:
+            entry = self._entries.get(source)
+        headers = {}
+        if entry is not None:
+            etag, modified = entry[0]
+            if etag:
+                headers["If-None-Match"] = etag
+            if modified:
+                headers["If-Modified-Since"] = modified
+        try:
+            response = requests.get(source, headers=headers, timeout=self.timeout,
+                                    allow_redirects=not self.restricted)
+            if response.status_code == 304 and entry is not None:
+                return list(entry[1])
+            response.raise_for_status()
+            if response.is_redirect:
+                raise PortfolioError(f"{source} redirects elsewhere; enter the final URL.")
+        except requests.RequestException as e:
+            if entry is not None:
+                log.warning("Serving the cached portfolio for %s: %s", source, e)
+                return list(entry[1])
+            raise PortfolioError(f"Failed to fetch portfolio from {source}: {e}")
+
+        tickers = read_tickers(response.content, unquote(urlparse(source).path))
+        if not tickers:
+            raise PortfolioError(f"No tickers found in {source}.")
+        return self._store(source, (response.headers.get("ETag"), response.headers.get("Last-Modified")), tickers)
@@ -0,0 +1,106 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from .data import load_universe_data
+from .universes import SECTOR_DRILLDOWNS, SECTOR_UNIVERSES
+
+log = logging.getLogger(__name__)
+
+
+def sibling_jobs(universe, sector, timeframe):
+    """Drill-down selections worth warming while ``universe``/``sector`` is on screen.
+
+    A parent universe (``US``, ``HK``) warms every sector below it, a sector
+    warms the other sectors of its group.
+    """
+    for drilldown, group in SECTOR_DRILLDOWNS.items():
+        if universe in (drilldown, group):
+            return [(drilldown, s, timeframe) for s in SECTOR_UNIVERSES[group] if s != sector]
+    return []
+
+
+class Prefetcher:
+    """Loads universe selections into ``price_cache`` on a background thread.
+
+    Each ``owner`` (one viewer session) has its own set of wanted jobs;
+    ``submit`` replaces only that owner's set, and jobs wanted by several
+    owners are queued once. A job leaves the queue when it runs or when no
+    owner wants it any more. At most ``max_pending`` jobs wait; a job
+    already running is allowed to finish since it only warms the cache.
+    """
+
+    def __init__(self, price_cache, max_pending=16, load=load_universe_data):
+        self.price_cache = price_cache
+        self.load = load
+        self.max_pending = max_pending
+        # job -> owners still wanting it, oldest first
+        self._pending = OrderedDict()
+        self._wanted = {}
+        self._running = 0
+        self._changed = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="rrg-prefetch", daemon=True)
+        self._thread.start()
+
+    def _release(self, owner, jobs):
+        # Called with the condition held
+        for job in jobs:
+            owners = self._pending.get(job)
+            if owners is not None:
+                owners.discard(owner)
+                if not owners:
+                    del self._pending[job]
+
+    def cancel(self, owner=None):
+        """Drop the pending jobs of ``owner``, or every pending job."""
+        with self._changed:
+            if owner is None:
+                self._pending.clear()
+                self._wanted.clear()
+            else:
+                self._release(owner, self._wanted.pop(owner, ()))
+            self._changed.notify_all()
+
+    def submit(self, jobs, owner=None):
+        """Make ``(universe, sector, timeframe)`` jobs the ones ``owner`` wants; returns how many are pending for it.
+
+        Submitting the same jobs again is a no-op, so reruns that keep the
+        selection do not requeue jobs that already ran.
+        """
+        jobs = list(dict.fromkeys(jobs))
+        with self._changed:
+            if self._wanted.get(owner) == jobs:
+                return sum(job in self._pending for job in jobs)
+            self._release(owner, [job for job in self._wanted.get(owner, ()) if job not in jobs])
+            self._wanted[owner] = jobs
+            for job in jobs:
+                if job in self._pending:
+                    self._pending[job].add(owner)
+                elif len(self._pending) < self.max_pending:
+                    self._pending[job] = {owner}
+            self._changed.notify_all()
+            return sum(job in self._pending for job in jobs)
+
+    def pending(self):
+        with self._changed:
+            return len(self._pending)
+
+    def join(self):
+        with self._changed:
+            self._changed.wait_for(lambda: not self._pending and not self._running)
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._pending)
+                job, _ = self._pending.popitem(last=False)
+                self._running += 1
+            try:
+                universe, sector, timeframe = job
+                self.load(self.price_cache, universe, sector, timeframe)
+            except Exception:
+                log.exception("Prefetch of %s failed", job)
+            finally:
+                with self._changed:
+                    self._running -= 1
+                    self._changed.notify_all()
@@ -0,0 +1,94 @@
+import functools
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_active = ContextVar("rrg_stage_recorder", default=None)
+
+
+class StageRecorder:
+    """Wall time, and optionally peak traced memory, of the pipeline stages run while it is active."""
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.records = []
+
+    def add(self, name, seconds, peak_bytes=None):
+        self.records.append((name, seconds, peak_bytes))
+
+    def totals(self):
+        """Per-stage call count, total seconds and largest peak, in first-seen order."""
+        totals = {}
+        for name, seconds, peak in self.records:
+            calls, total, largest = totals.get(name, (0, 0.0, None))
+            if peak is not None:
+                largest = peak if largest is None else max(largest, peak)
+            totals[name] = (calls + 1, total + seconds, largest)
+        return totals
+
+    def as_frame(self):
+        import pandas as pd
+
+        rows = [
+            {"Stage": name, "Calls": calls, "Seconds": round(total, 4),
+             "Peak MB": round(peak / 2 ** 20, 1) if peak is not None else None}
+            for name, (calls, total, peak) in self.totals().items()
+        ]
+        return pd.DataFrame(rows, columns=["Stage", "Calls", "Seconds", "Peak MB"])
+
+
+def start_recording(track_memory=False):
+    """Activate a new StageRecorder until ``stop_recording`` is called with it."""
+    recorder = StageRecorder(track_memory)
+    recorder._token = _active.set(recorder)
+    recorder._started_tracing = track_memory and not tracemalloc.is_tracing()
+    if recorder._started_tracing:
+        tracemalloc.start()
+    return recorder
+
+
+def stop_recording(recorder):
+    if recorder._started_tracing:
+        tracemalloc.stop()
+    _active.reset(recorder._token)
+
+
+@contextmanager
+def record(track_memory=False):
+    """Activate a StageRecorder for the duration of the block."""
+    recorder = start_recording(track_memory)
+    try:
+        yield recorder
+    finally:
+        stop_recording(recorder)
+
+
+@contextmanager
+def stage(name):
+    """Time the block as ``name`` if a recorder is active; a no-op otherwise."""
+    recorder = _active.get()
+    if recorder is None:
+        yield
+        return
+    # Nested stages are recorded under their own names, inner time is not subtracted
+    if recorder.track_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if recorder.track_memory else None
+        recorder.add(name, seconds, peak)
+
+
+def timed(name):
+    """Decorator form of ``stage``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+import numpy as np
+
+from .chart import CURVE_COLORS, QUADRANTS, apply_rrg_layout, quadrant_codes
+from .profiling import timed
+
+# Discrete colorscale over quadrant codes -1 (missing) to 3; numeric colors skip Plotly's per-element color validation
+_CODE_COLORSCALE = []
+for _i, _color in enumerate(["grey"] + [CURVE_COLORS[q] for q in QUADRANTS]):
+    _CODE_COLORSCALE += [[_i / 5, _color], [(_i + 1) / 5, _color]]
+
+
+def _code_marker(codes, size):
+    return dict(size=size, color=codes, colorscale=_CODE_COLORSCALE, cmin=-1.5, cmax=3.5)
+
+
+def build_replay_array(rrg_data, tickers, max_frames=None):
+    """Dates and a float32 (date x ticker x {ratio, momentum}) array of an RRG panel.
+
+    Only the last ``max_frames`` dates are kept, which bounds the memory of
+    long daily histories.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    rows = rrg_data.iloc[-max_frames:] if max_frames else rrg_data
+    coords = np.empty((len(rows), len(tickers), 2), dtype=np.float32)
+    coords[:, :, 0] = rows["RS-Ratio"][tickers].to_numpy(dtype=np.float32)
+    coords[:, :, 1] = rows["RS-Momentum"][tickers].to_numpy(dtype=np.float32)
+    return rows.index, tickers, coords
+
+
+def _replay_bounds(coords, padding=0.1):
+    x = coords[:, :, 0]
+    y = coords[:, :, 1]
+    if np.isnan(x).all():
+        return 70, 130, 70, 130
+    min_x, max_x = float(np.nanmin(x)), float(np.nanmax(x))
+    min_y, max_y = float(np.nanmin(y)), float(np.nanmax(y))
+    range_x = max_x - min_x
+    range_y = max_y - min_y
+    return (max(min_x - range_x * padding, 70), min(max_x + range_x * padding, 130),
+            max(min_y - range_y * padding, 70), min(max_y + range_y * padding, 130))
+
+
+def _frame_traces(coords, end, tail_length, labels, webgl):
+    # Plain dicts: frames are added to the figure unvalidated, which keeps hundreds of frames cheap to build
+    window = coords[max(end - tail_length + 1, 0):end + 1]
+    # Tails of every ticker in one trace, each followed by a NaN row to break the line
+    padded = np.concatenate([window, np.full((1,) + window.shape[1:], np.nan, dtype=np.float32)])
+    tail_x = padded[:, :, 0].T.ravel()
+    tail_y = padded[:, :, 1].T.ravel()
+    head = window[-1]
+    trace_type = "scattergl" if webgl else "scatter"
+    tails = dict(
+        type=trace_type, x=np.round(tail_x, 3), y=np.round(tail_y, 3), mode='lines+markers',
+        line=dict(color='grey', width=1), marker=_code_marker(quadrant_codes(tail_x, tail_y), 4),
+        hoverinfo='skip', showlegend=False
+    )
+    heads = dict(
+        type=trace_type, x=np.round(head[:, 0], 3), y=np.round(head[:, 1], 3),
+        mode='markers' if webgl else 'markers+text', marker=_code_marker(quadrant_codes(head[:, 0], head[:, 1]), 10),
+        text=labels, textposition="top center", hovertext=labels, hoverinfo='text', showlegend=False
+    )
+    return [tails, heads]
+
+
+@timed("replay frames")
+def create_replay_chart(rrg_data, benchmark, sectors, sector_names, universe, timeframe, tail_length,
+                        max_frames=120, step=1, webgl=False):
+    """Animated RRG over the last ``max_frames`` bars, every frame built from one in-memory array.
+
+    Returns a figure dict rather than a ``go.Figure``: validating hundreds of
+    frames through Plotly's object model costs seconds, so the frames are
+    kept as plain dicts and rendered with ``replay_html``.
+    """
+    import plotly.graph_objects as go
+
+    dates, tickers, coords = build_replay_array(rrg_data, sectors, max_frames)
+    labels = [sector_names.get(t) or t.replace('.HK', '') for t in tickers]
+    ends = list(range(len(dates) - 1, -1, -step))[::-1]
+
+    frames = [dict(data=_frame_traces(coords, end, tail_length, labels, webgl), name=str(dates[end].date()))
+              for end in ends]
+    fig = apply_rrg_layout(go.Figure(), _replay_bounds(coords), benchmark, universe, timeframe)
+
+    frame_args = dict(frame=dict(duration=150, redraw=webgl), transition=dict(duration=0), mode="immediate")
+    figure = fig.to_dict()
+    figure["layout"]["updatemenus"] = [dict(
+        type="buttons", direction="left", x=0, y=-0.08, xanchor="left", yanchor="top",
+        buttons=[
+            dict(label="Play", method="animate", args=[None, dict(frame_args, fromcurrent=True)]),
+            dict(label="Pause", method="animate", args=[[None], frame_args]),
+        ]
+    )]
+    figure["layout"]["sliders"] = [dict(
+        active=len(frames) - 1, x=0.1, y=-0.05, len=0.9, currentvalue=dict(prefix="Date: "),
+        steps=[dict(label=frame["name"], method="animate", args=[[frame["name"]], frame_args]) for frame in frames]
+    )]
+    figure["data"] = frames[-1]["data"] if frames else []
+    figure["frames"] = frames
+    return figure
+
+
+def replay_html(figure, include_plotlyjs="cdn"):
+    """Standalone HTML for a replay figure dict, serialized without Plotly's per-frame validation."""
+    import plotly.io as pio
+
+    return pio.to_html(figure, include_plotlyjs=include_plotlyjs, full_html=True, validate=False,
+                       auto_play=False, default_width="100%", default_height=800)
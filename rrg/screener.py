@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from .chart import QUADRANTS, quadrant_codes
+from .profiling import timed
+
+
+@timed("screener")
+def rotation_screener(rrg_data, sectors, sector_names=None, tail_length=10):
+    """One row per ticker describing where it sits on the RRG and how it is rotating.
+
+    Computed on the whole (date x ticker) panel at once. ``Bars In Quadrant``
+    counts bars since the ticker last changed quadrant (0 means it changed on
+    its latest bar, NaN that it never changed within the panel). ``Angle`` is
+    the position around (100, 100) in degrees counter-clockwise from the
+    RS-Ratio axis; ``Velocity`` is the mean distance travelled per bar over
+    the last ``tail_length`` bars.
+    """
+    tickers = list(dict.fromkeys(sectors))
+    sector_names = sector_names or {}
+    x = rrg_data["RS-Ratio"][tickers].to_numpy(dtype=np.float64)
+    y = rrg_data["RS-Momentum"][tickers].to_numpy(dtype=np.float64)
+    n_rows = x.shape[0]
+    columns = np.arange(len(tickers))
+
+    codes = quadrant_codes(x, y)
+    valid = codes >= 0
+    has_data = valid.any(axis=0)
+    last = np.where(has_data, n_rows - 1 - np.argmax(valid[::-1], axis=0), 0)
+    current = np.where(has_data, codes[last, columns], -1)
+    head_x = np.where(has_data, x[last, columns], np.nan)
+    head_y = np.where(has_data, y[last, columns], np.nan)
+
+    # Last valid bar spent in another quadrant
+    other = valid & (codes != current)
+    changed = other.any(axis=0) & has_data
+    before = np.where(changed, n_rows - 1 - np.argmax(other[::-1], axis=0), 0)
+    # NaN rows between the two quadrants do not count as bars, so the quadrant was entered on the first valid
+    # bar after it
+    valid_count = np.cumsum(valid, axis=0)
+    entered = np.where(changed, np.argmax(valid_count > valid_count[before, columns], axis=0), 0)
+    bars_in = np.where(changed, valid_count[last, columns] - valid_count[before, columns] - 1, np.nan)
+    previous = np.where(changed, codes[before, columns], -1)
+
+    tail_x = x[-tail_length:]
+    tail_y = y[-tail_length:]
+    steps = np.hypot(np.diff(tail_x, axis=0), np.diff(tail_y, axis=0))
+    step_count = (~np.isnan(steps)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        velocity = np.nansum(steps, axis=0) / step_count
+
+    labels = np.array(QUADRANTS + [None], dtype=object)
+    dates = pd.DatetimeIndex(rrg_data.index)
+    table = pd.DataFrame({
+        "Ticker": tickers,
+        "Name": [sector_names.get(t, "") for t in tickers],
+        "Quadrant": labels[current],
+        "Previous Quadrant": labels[previous],
+        "Entered": dates[entered].where(changed),
+        "Bars In Quadrant": bars_in,
+        "RS-Ratio": head_x,
+        "RS-Momentum": head_y,
+        "Angle": np.degrees(np.arctan2(head_y - 100, head_x - 100)) % 360,
+        "Distance": np.hypot(head_x - 100, head_y - 100),
+        "Velocity": velocity,
+    })
+    return table
+
+
+def filter_screener(table, quadrants=None, within_bars=None):
+    """Rows currently in one of ``quadrants`` that entered it on one of the last ``within_bars`` bars.
+
+    The latest bar counts as the first (``Bars In Quadrant`` 0), so
+    ``within_bars=1`` keeps only tickers that changed quadrant on it.
+    """
+    mask = pd.Series(True, index=table.index)
+    if quadrants:
+        mask &= table["Quadrant"].isin(quadrants)
+    if within_bars is not None:
+        mask &= table["Bars In Quadrant"] < within_bars
+    return table[mask]
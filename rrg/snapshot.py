@@ -0,0 +1,55 @@
+import json
+import os
+import time
+from urllib.parse import quote
+
+import pandas as pd
+
+from .store import DEFAULT_STORE_DIR
+
+DEFAULT_SNAPSHOT_DIR = os.environ.get("RRG_SNAPSHOT_DIR", os.path.join(DEFAULT_STORE_DIR, "snapshots"))
+
+
+def snapshot_key(universe, sector, timeframe):
+    return quote(f"{universe}__{sector or 'all'}__{timeframe}", safe="")
+
+
+def write_snapshot(universe, sector, timeframe, data, benchmark, sectors, sector_names, rrg_data,
+                   root=DEFAULT_SNAPSHOT_DIR):
+    """Save prices, RRG panel and labels of one selection as float32 Parquet plus a JSON header."""
+    os.makedirs(root, exist_ok=True)
+    base = os.path.join(root, snapshot_key(universe, sector, timeframe))
+    data.astype("float32").to_parquet(base + ".prices.parquet.tmp")
+    rrg_data.astype("float32").to_parquet(base + ".rrg.parquet.tmp")
+    with open(base + ".json.tmp", "w") as f:
+        json.dump({
+            "universe": universe,
+            "sector": sector,
+            "timeframe": timeframe,
+            "benchmark": benchmark,
+            "sectors": sectors,
+            "sector_names": sector_names,
+            "generated_at": time.time(),
+            "last_date": data.index.max().isoformat(),
+        }, f, ensure_ascii=False)
+    # Header goes last so readers never see it next to half-written panels
+    for suffix in (".prices.parquet", ".rrg.parquet", ".json"):
+        os.replace(base + suffix + ".tmp", base + suffix)
+
+
+def load_snapshot(universe, sector, timeframe, max_age=None, root=DEFAULT_SNAPSHOT_DIR):
+    """Return ``(data, benchmark, sectors, sector_names, rrg_data, generated_at)``.
+
+    None if missing or older than ``max_age`` seconds.
+    """
+    base = os.path.join(root, snapshot_key(universe, sector, timeframe))
+    try:
+        with open(base + ".json") as f:
+            header = json.load(f)
+        if max_age is not None and time.time() - header["generated_at"] > max_age:
+            return None
+        data = pd.read_parquet(base + ".prices.parquet")
+        rrg_data = pd.read_parquet(base + ".rrg.parquet")
+    except (OSError, ValueError, KeyError):
+        return None
+    return data, header["benchmark"], header["sectors"], header["sector_names"], rrg_data, header["generated_at"]
@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest merges still run, without the cross-process lock
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.environ.get(
+    "RRG_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".rrg_store"),
+)
+
+# Incremental downloads start this far before the last stored bar, so finished bars are re-fetched and can be
+# compared with the stored ones
+REVALIDATE_DAYS = 7
+
+# Relative difference between a stored and a re-fetched close that means the history was re-adjusted
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def _tmp_path(path):
+    # Unique per writer so two processes or threads never replace each other's half-written file
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class PriceStore:
+    """On-disk daily close store, one Parquet file per ticker.
+
+    A manifest records the date range each ticker has been fetched for, so
+    ``update`` only asks the data source for bars after the last stored one
+    (or for the whole window when the request reaches further back).
+    Closes are auto-adjusted, so when a split or dividend makes the source
+    re-adjust its history, the re-fetched overlap no longer matches the
+    stored bars; the ticker is then dropped and its whole window fetched
+    again instead of appending to stale history.
+
+    Several processes (the app and ``python -m rrg.batch``) may share one
+    directory: manifest changes are merged into the file on disk under a
+    file lock rather than overwriting it, and entries written by the other
+    processes are picked up before each update.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self._manifest_path = os.path.join(root, "manifest.json")
+        self._lock_path = os.path.join(root, "manifest.lock")
+        # Entries changed here and not yet merged into the file; None marks a dropped ticker
+        self._changes = {}
+        self._manifest_mtime = None
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _merged(self, manifest):
+        for ticker, entry in self._changes.items():
+            if entry is None:
+                manifest.pop(ticker, None)
+            else:
+                manifest[ticker] = entry
+        return manifest
+
+    def _refresh_manifest(self):
+        try:
+            mtime = os.stat(self._manifest_path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                self._manifest = self._merged(self._read_manifest())
+
+    def _write_manifest(self):
+        with self._lock, _file_lock(self._lock_path):
+            self._manifest = self._merged(self._read_manifest())
+            tmp = _tmp_path(self._manifest_path)
+            with open(tmp, "w") as f:
+                json.dump(self._manifest, f, indent=1, sort_keys=True)
+            os.replace(tmp, self._manifest_path)
+            self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+            self._changes = {}
+
+    def _path(self, ticker):
+        return os.path.join(self.root, quote(ticker, safe="") + ".parquet")
+
+    def coverage(self, ticker):
+        entry = self._manifest.get(ticker)
+        if entry is None:
+            return None
+        return pd.Timestamp(entry["start"]), pd.Timestamp(entry["last"])
+
+    def load(self, ticker, start=None, end=None):
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        series = pd.read_parquet(path)["Close"]
+        series.name = ticker
+        return series.loc[start:end]
+
+    def write(self, ticker, series, start, save_manifest=True):
+        series = series.dropna()
+        if series.empty:
+            return None
+        if series.index.tz is not None:
+            series = series.tz_localize(None)
+        with self._lock:
+            old = self.load(ticker)
+            if old is not None:
+                series = pd.concat([old[~old.index.isin(series.index)], series]).sort_index()
+            path = self._path(ticker)
+            tmp = _tmp_path(path)
+            series.to_frame("Close").to_parquet(tmp)
+            os.replace(tmp, path)
+
+            covered = self.coverage(ticker)
+            start = pd.Timestamp(start).normalize()
+            if covered is not None:
+                start = min(start, covered[0])
+            self._manifest[ticker] = self._changes[ticker] = {
+                "start": start.strftime("%Y-%m-%d"),
+                "last": series.index.max().strftime("%Y-%m-%d"),
+            }
+            if save_manifest:
+                self._write_manifest()
+        series.name = ticker
+        return series
+
+    def drop(self, ticker):
+        """Forget a ticker: remove its file and manifest entry."""
+        with self._lock:
+            self._manifest.pop(ticker, None)
+            self._changes[ticker] = None
+            try:
+                os.remove(self._path(ticker))
+            except FileNotFoundError:
+                pass
+
+    def _readjusted(self, ticker, fetched, fetch_from):
+        # Compare the bars both stored and re-fetched; the last stored one may have been a partial session
+        stored = self.load(ticker, fetch_from)
+        if stored is None or len(stored) < 2:
+            return False
+        fetched = fetched.dropna()
+        if fetched.index.tz is not None:
+            fetched = fetched.tz_localize(None)
+        overlap = stored.index[:-1].intersection(fetched.index)
+        if overlap.empty:
+            return False
+        return not np.allclose(fetched.loc[overlap].to_numpy(), stored.loc[overlap].to_numpy(),
+                               rtol=ADJUSTMENT_TOLERANCE, atol=0)
+
+    def plan(self, tickers, start):
+        """Group tickers by the date their next download has to start from."""
+        start = pd.Timestamp(start).normalize()
+        groups = {}
+        for ticker in tickers:
+            covered = self.coverage(ticker)
+            if covered is None or start < covered[0]:
+                fetch_from = start
+            else:
+                # Re-request the last stored bar (it may have been a partial session) and a few finished ones
+                fetch_from = max(covered[1] - pd.Timedelta(days=REVALIDATE_DAYS), covered[0])
+            groups.setdefault(fetch_from, []).append(ticker)
+        return groups
+
+    def update(self, tickers, start, end, download):
+        """Bring ``tickers`` up to ``end`` using ``download(tickers, start, end)``.
+
+        Returns the full stored series of every ticker that received new
+        bars, so callers do not have to read them back from disk.
+        """
+        start = pd.Timestamp(start).normalize()
+        self._refresh_manifest()
+        updated = {}
+        readjusted = []
+        for fetch_from, group in self.plan(tickers, start).items():
+            data = download(group, fetch_from, end)
+            for ticker in group:
+                if ticker in data.columns and data[ticker].notna().any():
+                    if fetch_from > start and self._readjusted(ticker, data[ticker], fetch_from):
+                        readjusted.append(ticker)
+                        continue
+                    # The manifest is rewritten once at the end, not once per ticker
+                    updated[ticker] = self.write(ticker, data[ticker], fetch_from, save_manifest=False)
+        if readjusted:
+            for ticker in readjusted:
+                self.drop(ticker)
+            data = download(readjusted, start, end)
+            for ticker in readjusted:
+                if ticker in data.columns and data[ticker].notna().any():
+                    updated[ticker] = self.write(ticker, data[ticker], start, save_manifest=False)
+        if updated or readjusted:
+            with self._lock:
+                self._write_manifest()
+        return updated
+
+    def read_panel(self, tickers, start=None, end=None):
+        series = {}
+        for ticker in tickers:
+            loaded = self.load(ticker, start, end)
+            if loaded is not None and not loaded.empty:
+                series[ticker] = loaded
+        if not series:
+            return pd.DataFrame()
+        return pd.concat(series, axis=1).sort_index()
@@ -0,0 +1,103 @@
+class UniverseError(Exception):
+    pass
+
+
+SECTOR_UNIVERSES = {
+    "US": {
+        "XLK": ["AAPL", "MSFT", "NVDA", "AVGO", "ADBE", "MU", "CRM", "ASML", "SNPS", "IBM", "INTC", "TXN", "NOW", "QCOM", "AMD", "AMAT", "NOW", "PANW", "CDNS", "TSMC"],
+        "XLY": ["AMZN", "TSLA", "HD", "MCD", "NKE", "LOW", "SBUX", "TJX", "BKNG", "MAR", "F", "GM", "ORLY", "DHI", "CMG", "TJX", "YUM", "LEN", "ULTA", "CCL", "EXPE"],
+        "XLV": ["UNH", "JNJ", "LLY", "PFE", "ABT", "TMO", "MRK", "ABBV", "DHR", "BMY", "AMGN", "CVS", "ISRG", "MDT", "GILD", "VRTX", "CI", "ZTS", "RGEN", "BSX", "HCA"],
+        "XLF": ["BRK.B", "JPM", "BAC", "WFC", "GS", "MS", "SPGI", "BLK", "C", "AXP", "CB", "MMC", "PGR", "PNC", "TFC", "V", "MA", "PYPL", "AON", "CME", "ICE", "COF"],
+        "XLC": ["META", "GOOGL", "GOOG", "NFLX", "CMCSA", "DIS", "VZ", "T", "TMUS", "ATVI", "EA", "TTWO", "MTCH", "CHTR", "DISH", "FOXA", "TTWO", "FOX", "NWS", "WBD"],
+        "XLI": ["UNP", "HON", "UPS", "BA", "CAT", "GE", "MMM", "RTX", "LMT", "FDX", "DE", "ETN", "EMR", "NSC", "CSX", "ADP", "GD", "NOC", "FDX", "JCI", "CARR", "ITW"],
+        "XLE": ["XOM", "CVX", "COP", "SLB", "EOG", "MPC", "PSX", "VLO", "OXY", "KMI", "WMB", "HES", "HAL", "DVN", "BKR", "CTRA", "EQT", "APA", "MRO", "TRGP", "FANG"],
+        "XLB": ["LIN", "APD", "SHW", "FCX", "ECL", "NEM", "DOW", "DD", "CTVA", "PPG", "NUE", "VMC", "ALB", "FMC", "CE", "MLM", "IFF", "STLD", "CF", "FMC"],
+        "XLP": ["PG", "KO", "PEP", "COST", "WMT", "PM", "MO", "EL", "CL", "GIS", "KMB", "SYY", "KHC", "STZ", "HSY", "TGT", "ADM", "MNST", "DG", "DLTR", "WBA", "SJM"],
+        "XLU": ["NEE", "DUK", "SO", "D", "AEP", "SRE", "EXC", "XEL", "PCG", "WEC", "ES", "ED", "DTE", "AEE", "ETR", "CEG", "PCG", "EIX", "FFE", "CMS", "CNP", "PPL"],
+        "XLRE": ["PLD", "AMT", "CCI", "EQIX", "PSA", "O", "WELL", "SPG", "SBAC", "AVB", "EQR", "DLR", "VTR", "ARE", "CBRE", "WY", "EXR", "MAA", "IRM", "ESS", "HST"]
+    },
+    "HK": {
+        "^HSNU": ["0002.HK", "0003.HK", "0006.HK", "0836.HK", "1038.HK", "2688.HK",],
+        "^HSNF": ["0005.HK", "0011.HK", "0388.HK", "0939.HK", "1398.HK", "2318.HK", "2388.HK", "2628.HK","3968.HK","3988.HK","1299.HK"],
+        "^HSNP": ["0012.HK", "0016.HK", "0017.HK", "0101.HK", "0823.HK", "0688.HK", "1109.HK", "1997.HK", "1209.HK", "0960.HK","1113.HK"],
+        "^HSNC": ["0700.HK", "0857.HK", "0883.HK", "0941.HK", "0001.HK","0175.HK","0241.HK","0267.HK","0285.HK","0027.HK",
+                  "0288.HK","0291.HK","0316.HK","0332.HK", "0386.HK", "0669.HK", "0762.HK", "0968.HK", "0981.HK", "0386.HK"]
+    }
+}
+
+# Universes that need a sector picked, mapped to the SECTOR_UNIVERSES group they draw from
+SECTOR_DRILLDOWNS = {"US Sectors": "US", "HK Sub-indexes": "HK"}
+
+
+def resolve_universe(universe, sector=None, custom_tickers=None, custom_benchmark=None):
+    """Benchmark, member tickers and display names of a universe selection."""
+    if universe == "WORLD":
+        benchmark = "ACWI"
+        sectors = ["^GSPC", "^NDX", "^RUT", "^HSI", "3032.HK", "^STOXX50E", "^BSESN", "^KS11", 
+                   "^TWII", "000300.SS", "^N225", "HYG", "AGG", "EEM", "GDX", "XLE", "XME", "AAXJ","IBB","DBA"]
+        sector_names = {
+            "^GSPC": "標普500", "^NDX": "納指100", "^RUT": "羅素2000", "^HSI": "恆指",
+            "3032.HK": "恒生科技", "^STOXX50E": "歐洲", "^BSESN": "印度", "^KS11": "韓國",
+            "^TWII": "台灣", "000300.SS": "滬深300", "^N225": "日本", "HYG": "高收益債券",
+            "AGG": "投資級別債券", "EEM": "新興市場", "GDX": "金礦", "XLE": "能源",
+            "XME": "礦業", "AAXJ": "亞太日本除外", "IBB": "生物科技","DBA":"農業"
+        }
+    elif universe == "US":
+        benchmark = "^GSPC"
+        sectors = list(SECTOR_UNIVERSES["US"].keys())
+        sector_names = {
+            "XLK": "科技", "XLY": "非必須消費", "XLV": "健康護理",
+            "XLF": "金融", "XLC": "通訊", "XLI": "工業", "XLE": "能源",
+            "XLB": "物料", "XLP": "必須消費", "XLU": "公用", "XLRE": "房地產"
+        }
+    elif universe == "US Sectors":
+        if sector:
+            benchmark = sector
+            sectors = SECTOR_UNIVERSES["US"][sector]
+            sector_names = {s: "" for s in sectors}
+        else:
+            raise UniverseError("Please select a US sector.")
+    elif universe == "HK":
+        benchmark = "^HSI"
+        sectors = list(SECTOR_UNIVERSES["HK"].keys())
+        sector_names = {"^HSNU": "公用", "^HSNF": "金融", "^HSNP": "地產", "^HSNC": "工商"}
+    elif universe == "HK Sub-indexes":
+        if sector:
+            benchmark = sector
+            sectors = SECTOR_UNIVERSES["HK"][sector]
+            sector_names = {s: "" for s in sectors}
+        else:
+            raise UniverseError("Please select a HK sub-index.")
+    elif universe == "Customised Portfolio":
+        if custom_benchmark and custom_tickers:
+            benchmark = custom_benchmark
+            sectors = [ticker for ticker in custom_tickers if ticker]
+            sector_names = {s: "" for s in sectors}
+        else:
+            raise UniverseError("Please provide at least one stock ticker and select a benchmark for your custom portfolio.")
+    elif universe == "Index Constituents":
+        if custom_benchmark and custom_tickers:
+            benchmark = custom_benchmark
+            sectors = [ticker for ticker in custom_tickers if ticker]
+            sector_names = {s: "" for s in sectors}
+        else:
+            raise UniverseError("Please upload a constituents file and select a benchmark.")
+    elif universe == "FX":
+        benchmark = "HKDUSD=X"
+        sectors = ["GBPUSD=X", "EURUSD=X", "AUDUSD=X", "NZDUSD=X", "CADUSD=X", "CHFUSD=X", "JPYUSD=X", "CNYUSD=X",  "EURGBP=X", "AUDNZD=X", "AUDCAD=X", "NZDCAD=X", "DX-Y.NYB"]
+        sector_names = {
+            "GBPUSD=X": "GBP", "EURUSD=X": "EUR", "AUDUSD=X": "AUD", "NZDUSD=X": "NZD",
+            "CADUSD=X": "CAD",  "JPYUSD=X": "JPY", "EURGBP=X": "EURGBP", "AUDNZD=X": "AUDNZD",
+            "AUDCAD=X": "AUDCAD", "NZDCAD=X": "NZDCAD", "DX-Y.NYB":"DXY", "CHFUSD=X":"CHF","CNYUSD=X":"CNY" 
+        }
+    else:
+        raise UniverseError("Invalid universe selection.")
+    return benchmark, sectors, sector_names
+
+
+def universe_jobs():
+    """Every (universe, sector) selection that does not depend on user input."""
+    jobs = [("WORLD", None), ("US", None), ("HK", None), ("FX", None)]
+    for universe, group in SECTOR_DRILLDOWNS.items():
+        jobs.extend((universe, sector) for sector in SECTOR_UNIVERSES[group])
+    return jobs
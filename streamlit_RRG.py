@@ -1,530 +1,673 @@
 import streamlit as st
-import yfinance as yf
+import hashlib
+import itertools
+import os
+import time
+import uuid
+from contextlib import nullcontext
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from streamlit.runtime.scriptrunner import RerunData, RerunException
-import streamlit.components.v1 as components
-
-# Set page config to wide layout
-st.set_page_config(layout="wide", page_title="Relative Rotation Graph (RRG) by JC")
-
-class GitHubFetchError(Exception):
-    pass
+from rrg import DEFAULT_PARAMS, RRGParams, calculate_rrg_for_timeframe, ratio_panel, rrg_from_ratios, to_weekly
+from rrg.cache import PriceCache
+from rrg.chart import (QUADRANTS, create_cluster_rrg_chart, create_large_rrg_chart, create_rrg_chart,
+                       figure_payload_size, top_movers)
+from rrg.coordinator import MISS, Coordinator
+from rrg.data import load_universe_data
+from rrg.export import export_rrg, load_export, read_figure
+from rrg.incremental import RRGBook
+from rrg.intraday import INTRADAY_MINUTES, IntradayFeed
+from rrg.portfolio import PRESET_PORTFOLIO_URL, PortfolioError, PortfolioLoader, normalize_tickers
+from rrg.prefetch import Prefetcher, sibling_jobs
+from rrg.profiling import record, stage
+from rrg.screener import filter_screener, rotation_screener
+from rrg.snapshot import load_snapshot
+from rrg.store import DEFAULT_STORE_DIR, PriceStore
+from rrg.universes import UniverseError, resolve_universe
+
+# Folder on the server that viewers may load constituents files from by name; unset allows URLs only
+PORTFOLIO_DIR = os.environ.get("RRG_PORTFOLIO_DIR")
+
+@st.cache_resource
+def get_portfolio_loader():
+    # Sources are typed by viewers: public http(s) URLs and files under PORTFOLIO_DIR only
+    return PortfolioLoader(base_dir=PORTFOLIO_DIR, restricted=True)
 
 def fetch_portfolio_from_github():
-    try:
-        import requests
-    except ImportError:
-        raise GitHubFetchError("The 'requests' library is not installed. Please install it to fetch the portfolio from GitHub.")
-    
-    url = "https://raw.githubusercontent.com/jasonckb/RRG-Dashboard/main/Customised%20Portfolio.txt"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raises a HTTPError if the status is 4xx, 5xx
-        tickers = [line.strip() for line in response.text.split('\n') if line.strip()]
-        if not tickers:
-            raise GitHubFetchError("No tickers found in the GitHub file.")
-        return tickers
-    except requests.RequestException as e:
-        raise GitHubFetchError(f"Failed to fetch portfolio from GitHub: {e}")
+    # Revalidated with the cached ETag, so a reset only downloads and parses the file again when it changed
+    return get_portfolio_loader().load(PRESET_PORTFOLIO_URL)
 
 def get_preset_portfolio():
     try:
         return fetch_portfolio_from_github()
-    except GitHubFetchError as e:
+    except PortfolioError as e:
         st.error(str(e))
         st.error("Unable to load preset portfolio. Please check your internet connection or try again later.")
         return None
 
 
-def refresh_data():
-    try:
-        # Clear all cached data
-        st.cache_data.clear()
-        
-        # Re-fetch data for the current universe
-        universe = st.session_state.get('selected_universe', 'WORLD')
-        sector = st.session_state.get('sector', None)
-        timeframe = st.session_state.get('timeframe', 'Weekly')
-        custom_tickers = st.session_state.get('custom_tickers', None)
-        custom_benchmark = st.session_state.get('custom_benchmark', None)
-        
-        # Call get_data with current parameters to refresh the data
-        get_data(universe, sector, timeframe, custom_tickers, custom_benchmark)
-        
-        st.session_state.data_refreshed = True
-        st.success("Data refreshed successfully!")
-    except Exception as e:
-        st.error(f"An error occurred while refreshing data: {str(e)}")
-        st.session_state.data_refreshed = False
+# Universes built from user input, never precomputed
+USER_UNIVERSES = ("Customised Portfolio", "Index Constituents")
 
+# Above this many tickers the chart offers WebGL batching or top-mover decimation
+LARGE_UNIVERSE_THRESHOLD = 60
+EXTRA_BENCHMARK_OPTIONS = ["^HSI", "ACWI", "^GSPC", "^NDX", "^HSCE", "^HSNF", "^HSNU", "^HSNP", "^HSNC", "3032.HK"]
 
-@st.cache_data
-def ma(data, period):
-    return data.rolling(window=period).mean()
-
-@st.cache_data
-def calculate_rrg_values(data, benchmark):
-    sbr = data / benchmark
-    rs1 = ma(sbr, 10)
-    rs2 = ma(sbr, 26)
-    rs = 100 * ((rs1 - rs2) / rs2 + 1)
-    rm1 = ma(rs, 1)
-    rm2 = ma(rs, 4)
-    rm = 100 * ((rm1 - rm2) / rm2 + 1)
-    return rs, rm
-
-@st.cache_data
-def get_data(universe, sector, timeframe, custom_tickers=None, custom_benchmark=None):
-    end_date = datetime.now()
-    if timeframe == "Weekly":
-        start_date = end_date - timedelta(weeks=100)
-    else:  # Daily
-        start_date = end_date - timedelta(days=500)
-
-    sector_universes = {
-        "US": {
-            "XLK": ["AAPL", "MSFT", "NVDA", "AVGO", "ADBE", "MU", "CRM", "ASML", "SNPS", "IBM", "INTC", "TXN", "NOW", "QCOM", "AMD", "AMAT", "NOW", "PANW", "CDNS", "TSMC"],
-            "XLY": ["AMZN", "TSLA", "HD", "MCD", "NKE", "LOW", "SBUX", "TJX", "BKNG", "MAR", "F", "GM", "ORLY", "DHI", "CMG", "TJX", "YUM", "LEN", "ULTA", "CCL", "EXPE"],
-            "XLV": ["UNH", "JNJ", "LLY", "PFE", "ABT", "TMO", "MRK", "ABBV", "DHR", "BMY", "AMGN", "CVS", "ISRG", "MDT", "GILD", "VRTX", "CI", "ZTS", "RGEN", "BSX", "HCA"],
-            "XLF": ["BRK.B", "JPM", "BAC", "WFC", "GS", "MS", "SPGI", "BLK", "C", "AXP", "CB", "MMC", "PGR", "PNC", "TFC", "V", "MA", "PYPL", "AON", "CME", "ICE", "COF"],
-            "XLC": ["META", "GOOGL", "GOOG", "NFLX", "CMCSA", "DIS", "VZ", "T", "TMUS", "ATVI", "EA", "TTWO", "MTCH", "CHTR", "DISH", "FOXA", "TTWO", "FOX", "NWS", "WBD"],
-            "XLI": ["UNP", "HON", "UPS", "BA", "CAT", "GE", "MMM", "RTX", "LMT", "FDX", "DE", "ETN", "EMR", "NSC", "CSX", "ADP", "GD", "NOC", "FDX", "JCI", "CARR", "ITW"],
-            "XLE": ["XOM", "CVX", "COP", "SLB", "EOG", "MPC", "PSX", "VLO", "OXY", "KMI", "WMB", "HES", "HAL", "DVN", "BKR", "CTRA", "EQT", "APA", "MRO", "TRGP", "FANG"],
-            "XLB": ["LIN", "APD", "SHW", "FCX", "ECL", "NEM", "DOW", "DD", "CTVA", "PPG", "NUE", "VMC", "ALB", "FMC", "CE", "MLM", "IFF", "STLD", "CF", "FMC"],
-            "XLP": ["PG", "KO", "PEP", "COST", "WMT", "PM", "MO", "EL", "CL", "GIS", "KMB", "SYY", "KHC", "STZ", "HSY", "TGT", "ADM", "MNST", "DG", "DLTR", "WBA", "SJM"],
-            "XLU": ["NEE", "DUK", "SO", "D", "AEP", "SRE", "EXC", "XEL", "PCG", "WEC", "ES", "ED", "DTE", "AEE", "ETR", "CEG", "PCG", "EIX", "FFE", "CMS", "CNP", "PPL"],
-            "XLRE": ["PLD", "AMT", "CCI", "EQIX", "PSA", "O", "WELL", "SPG", "SBAC", "AVB", "EQR", "DLR", "VTR", "ARE", "CBRE", "WY", "EXR", "MAA", "IRM", "ESS", "HST"]
-        },
-        "HK": {
-            "^HSNU": ["0002.HK", "0003.HK", "0006.HK", "0836.HK", "1038.HK", "2688.HK",],
-            "^HSNF": ["0005.HK", "0011.HK", "0388.HK", "0939.HK", "1398.HK", "2318.HK", "2388.HK", "2628.HK","3968.HK","3988.HK","1299.HK"],
-            "^HSNP": ["0012.HK", "0016.HK", "0017.HK", "0101.HK", "0823.HK", "0688.HK", "1109.HK", "1997.HK", "1209.HK", "0960.HK","1113.HK"],
-            "^HSNC": ["0700.HK", "0857.HK", "0883.HK", "0941.HK", "0001.HK","0175.HK","0241.HK","0267.HK","0285.HK","0027.HK",
-                      "0288.HK","0291.HK","0316.HK","0332.HK", "0386.HK", "0669.HK", "0762.HK", "0968.HK", "0981.HK", "0386.HK"]
-        }
-    }
+# Exported artifacts offered for download: (manifest key, label, MIME type)
+EXPORT_DOWNLOADS = [("html", "HTML", "text/html"), ("json", "Figure JSON", "application/json"),
+                    ("csv", "Coordinates CSV", "text/csv")]
 
-    if universe == "WORLD":
-        benchmark = "ACWI"
-        sectors = ["^GSPC", "^NDX", "^RUT", "^HSI", "3032.HK", "^STOXX50E", "^BSESN", "^KS11", 
-                   "^TWII", "000300.SS", "^N225", "HYG", "AGG", "EEM", "GDX", "XLE", "XME", "AAXJ","IBB","DBA"]
-        sector_names = {
-            "^GSPC": "標普500", "^NDX": "納指100", "^RUT": "羅素2000", "^HSI": "恆指",
-            "3032.HK": "恒生科技", "^STOXX50E": "歐洲", "^BSESN": "印度", "^KS11": "韓國",
-            "^TWII": "台灣", "000300.SS": "滬深300", "^N225": "日本", "HYG": "高收益債券",
-            "AGG": "投資級別債券", "EEM": "新興市場", "GDX": "金礦", "XLE": "能源",
-            "XME": "礦業", "AAXJ": "亞太日本除外", "IBB": "生物科技","DBA":"農業"
-        }
-    elif universe == "US":
-        benchmark = "^GSPC"
-        sectors = list(sector_universes["US"].keys())
-        sector_names = {
-            "XLK": "科技", "XLY": "非必須消費", "XLV": "健康護理",
-            "XLF": "金融", "XLC": "通訊", "XLI": "工業", "XLE": "能源",
-            "XLB": "物料", "XLP": "必須消費", "XLU": "公用", "XLRE": "房地產"
-        }
-    elif universe == "US Sectors":
-        if sector:
-            benchmark = sector
-            sectors = sector_universes["US"][sector]
-            sector_names = {s: "" for s in sectors}
-        else:
-            st.error("Please select a US sector.")
-            return None, None, None, None
-    elif universe == "HK":
-        benchmark = "^HSI"
-        sectors = list(sector_universes["HK"].keys())
-        sector_names = {"^HSNU": "公用", "^HSNF": "金融", "^HSNP": "地產", "^HSNC": "工商"}
-    elif universe == "HK Sub-indexes":
-        if sector:
-            benchmark = sector
-            sectors = sector_universes["HK"][sector]
-            sector_names = {s: "" for s in sectors}
-        else:
-            st.error("Please select a HK sub-index.")
-            return None, None, None, None
-    elif universe == "Customised Portfolio":
-        if custom_benchmark and custom_tickers:
-            benchmark = custom_benchmark
-            sectors = [ticker for ticker in custom_tickers if ticker]
-            sector_names = {s: "" for s in sectors}
-        else:
-            st.error("Please provide at least one stock ticker and select a benchmark for your custom portfolio.")
-            return None, None, None, None
-    elif universe == "FX":
-        benchmark = "HKDUSD=X"
-        sectors = ["GBPUSD=X", "EURUSD=X", "AUDUSD=X", "NZDUSD=X", "CADUSD=X", "CHFUSD=X", "JPYUSD=X", "CNYUSD=X",  "EURGBP=X", "AUDNZD=X", "AUDCAD=X", "NZDCAD=X", "DX-Y.NYB"]
-        sector_names = {
-            "GBPUSD=X": "GBP", "EURUSD=X": "EUR", "AUDUSD=X": "AUD", "NZDUSD=X": "NZD",
-            "CADUSD=X": "CAD",  "JPYUSD=X": "JPY", "EURGBP=X": "EURGBP", "AUDNZD=X": "AUDNZD",
-            "AUDCAD=X": "AUDCAD", "NZDCAD=X": "NZDCAD", "DX-Y.NYB":"DXY", "CHFUSD=X":"CHF","CNYUSD=X":"CNY" 
-        }
-    else:
-        st.error("Invalid universe selection.")
-        return None, None, None, None
+# Snapshots older than this (seconds) are ignored and the data is loaded live
+SNAPSHOT_MAX_AGE = float(os.environ.get("RRG_SNAPSHOT_MAX_AGE", 6 * 3600))
 
-    try:
-        tickers_to_download = [benchmark] + sectors
-        st.info(f"Attempting to download data for: {', '.join(tickers_to_download)}")
-        
-        data = yf.download(tickers_to_download, start=start_date, end=end_date)['Close']
-        
-        # Check the actual date range of the downloaded data
-        actual_start_date = data.index.min()
-        actual_end_date = data.index.max()
-        
-        st.info(f"Data available from {actual_start_date.date()} to {actual_end_date.date()}")
-        
-        if actual_end_date.date() < end_date.date() - timedelta(days=1):
-            st.warning(f"The most recent data available is from {actual_end_date.date()}. "
-                       f"This may be due to market holidays or delays in data updates.")
-        
-        missing_tickers = set(tickers_to_download) - set(data.columns)
-        if missing_tickers:
-            st.warning(f"The following tickers could not be downloaded: {', '.join(missing_tickers)}")
-            
-            if universe == "WORLD":
-                if "^TWII" in missing_tickers:
-                    st.info("Attempting to download alternative for ^TWII: TAIEX")
-                    twii_data = yf.download("TAIEX", start=start_date, end=end_date)['Close']
-                    if not twii_data.empty:
-                        data["^TWII"] = twii_data
-                        missing_tickers.remove("^TWII")
-                        st.success("Successfully downloaded TAIEX as a proxy for ^TWII")
-                
-                if "3032.HK" in missing_tickers:
-                    st.info("Attempting to download alternative for 3032.HK: ^HSTECH")
-                    hstech_data = yf.download("^HSTECH", start=start_date, end=end_date)['Close']
-                    if not hstech_data.empty:
-                        data["3032.HK"] = hstech_data
-                        missing_tickers.remove("3032.HK")
-                        st.success("Successfully downloaded ^HSTECH as a proxy for 3032.HK")
-            
-            for missing_ticker in missing_tickers:
-                data[missing_ticker] = pd.Series(index=data.index, dtype='float64')
-
-        if data.empty:
-            st.error(f"No data available for the selected universe and sector.")
-            return None, benchmark, sectors, sector_names
-        
-        data = data.dropna(axis=1, how='all')
-        
-        if benchmark not in data.columns:
-            st.error(f"No data available for the benchmark {benchmark}. Please choose a different benchmark.")
-            return None, benchmark, sectors, sector_names
-        
-        valid_sectors = [s for s in sectors if s in data.columns]
-        if len(valid_sectors) == 0:
-            st.error("No valid sector data available. Please check your input and try again.")
-            return None, benchmark, sectors, sector_names
-        
-        sectors = valid_sectors
-        sector_names = {s: sector_names[s] for s in valid_sectors if s in sector_names}
-        
-    except Exception as e:
-        st.error(f"Error fetching data: {str(e)}")
-        return None, benchmark, sectors, sector_names
 
-    st.success(f"Successfully downloaded data for {len(data.columns)} tickers.")
-    return data, benchmark, sectors, sector_names
+@st.cache_resource
+def get_price_cache():
+    return PriceCache(PriceStore())
 
-def create_rrg_chart(data, benchmark, sectors, sector_names, universe, timeframe, tail_length):
-    if timeframe == "Weekly":
-        data_resampled = data.resample('W-FRI').last()
-    else:  # Daily
-        data_resampled = data
 
-    rrg_data = pd.DataFrame()
-    for sector in sectors:
-        rs_ratio, rs_momentum = calculate_rrg_values(data_resampled[sector], data_resampled[benchmark])
-        rrg_data[f"{sector}_RS-Ratio"] = rs_ratio
-        rrg_data[f"{sector}_RS-Momentum"] = rs_momentum
-
-    # Consider last 10 data points for boundary calculation
-    boundary_data = rrg_data.iloc[-10:]
-    
-    padding = 0.1
-    min_x = boundary_data[[f"{sector}_RS-Ratio" for sector in sectors]].min().min()
-    max_x = boundary_data[[f"{sector}_RS-Ratio" for sector in sectors]].max().max()
-    min_y = boundary_data[[f"{sector}_RS-Momentum" for sector in sectors]].min().min()
-    max_y = boundary_data[[f"{sector}_RS-Momentum" for sector in sectors]].max().max()
-
-    range_x = max_x - min_x
-    range_y = max_y - min_y
-    min_x = max(min_x - range_x * padding, 70)
-    max_x = min(max_x + range_x * padding, 130)
-    min_y = max(min_y - range_y * padding, 70)
-    max_y = min(max_y + range_y * padding, 130)
-
-    fig = go.Figure()
-
-    quadrant_colors = {"Lagging": "pink", "Weakening": "lightyellow", "Improving": "lightblue", "Leading": "lightgreen"}
-    curve_colors = {"Lagging": "red", "Weakening": "orange", "Improving": "darkblue", "Leading": "darkgreen"}
-
-    def get_quadrant(x, y):
-        if x < 100 and y < 100: return "Lagging"
-        elif x >= 100 and y < 100: return "Weakening"
-        elif x < 100 and y >= 100: return "Improving"
-        else: return "Leading"
-
-    for sector in sectors:
-        x_values = rrg_data[f"{sector}_RS-Ratio"].iloc[-tail_length:].dropna()
-        y_values = rrg_data[f"{sector}_RS-Momentum"].iloc[-tail_length:].dropna()
-        if len(x_values) > 0 and len(y_values) > 0:
-            current_quadrant = get_quadrant(x_values.iloc[-1], y_values.iloc[-1])
-            color = curve_colors[current_quadrant]
-            
-            if universe == "FX":
-                legend_label = f"{sector} ({sector_names.get(sector, '')})"
-                chart_label = sector_names.get(sector, sector)
-            elif universe == "US Sectors" or universe == "HK Sub-indexes" or universe == "Customised Portfolio":
-                legend_label = sector
-                chart_label = sector.replace('.HK', '')
-            else:
-                legend_label = f"{sector} ({sector_names.get(sector, '')})"
-                chart_label = f"{sector_names.get(sector, sector)}"
-            
-            fig.add_trace(go.Scatter(
-                x=x_values, y=y_values, mode='lines+markers', name=legend_label,
-                line=dict(color=color, width=2), marker=dict(size=6, symbol='circle'),
-                legendgroup=sector, showlegend=True
-            ))
-            
-            # Determine text position based on momentum comparison
-            if len(y_values) > 1:
-                current_momentum = y_values.iloc[-1]
-                last_momentum = y_values.iloc[-2]
-                text_position = "top center" if current_momentum > last_momentum else "bottom center"
-            else:
-                text_position = "top center"
-            
-            # Add only the latest point as a larger marker with text
-            fig.add_trace(go.Scatter(
-                x=[x_values.iloc[-1]], y=[y_values.iloc[-1]], mode='markers+text',
-                name=f"{sector} (latest)", marker=dict(color=color, size=12, symbol='circle'),
-                text=[chart_label], textposition=text_position, legendgroup=sector, showlegend=False,
-                textfont=dict(color='black', size=12, family='Arial Black')
-            ))
-
-    fig.update_layout(
-        title=f"Relative Rotation Graph (RRG) for {universe} ({timeframe})",
-        xaxis_title="RS-Ratio",
-        yaxis_title="RS-Momentum",
-        width=1200,
-        height=800,
-        xaxis=dict(range=[min_x, max_x], title_font=dict(size=14)),
-        yaxis=dict(range=[min_y, max_y], title_font=dict(size=14)),
-        plot_bgcolor='white',
-        legend=dict(yanchor="top", y=0.99, xanchor="left", x=1.02, title=f"Legend<br>Benchmark: {benchmark}"),
-        shapes=[
-            dict(type="rect", xref="x", yref="y", x0=min_x, y0=100, x1=100, y1=max_y, fillcolor="lightblue", opacity=0.35, line_width=0),
-            dict(type="rect", xref="x", yref="y", x0=100, y0=100, x1=max_x, y1=max_y, fillcolor="lightgreen", opacity=0.35, line_width=0),
-            dict(type="rect", xref="x", yref="y", x0=min_x, y0=min_y, x1=100, y1=100, fillcolor="pink", opacity=0.35, line_width=0),
-            dict(type="rect", xref="x", yref="y", x0=100, y0=min_y, x1=max_x, y1=100, fillcolor="lightyellow", opacity=0.35, line_width=0),
-            dict(type="line", xref="x", yref="y", x0=100, y0=min_y, x1=100, y1=max_y, line=dict(color="black", width=1)),
-            dict(type="line", xref="x", yref="y", x0=min_x, y0=100, x1=max_x, y1=100, line=dict(color="black", width=1)),
-        ]
-    )
+@st.cache_resource
+def get_coordinator():
+    # Shared by every session: identical data loads and RRG computations run once and concurrent callers wait on it
+    return Coordinator()
 
-    label_font = dict(size=32, color='black', family='Arial Black')
-    fig.add_annotation(x=min_x, y=min_y, text="落後", showarrow=False, font=label_font, xanchor="left", yanchor="bottom")
-    fig.add_annotation(x=max_x, y=min_y, text="轉弱", showarrow=False, font=label_font, xanchor="right", yanchor="bottom")
-    fig.add_annotation(x=min_x, y=max_y, text="改善", showarrow=False, font=label_font, xanchor="left", yanchor="top")
-    fig.add_annotation(x=max_x, y=max_y, text="領先", showarrow=False, font=label_font, xanchor="right", yanchor="top")
-
-    return fig
-
-
-
-# Main Streamlit app
-st.title("Relative Rotation Graph (RRG) by JC")
-
-# Initialize session state
-if 'selected_universe' not in st.session_state:
-    st.session_state.selected_universe = "WORLD"
-if 'data_refreshed' not in st.session_state:
-    st.session_state.data_refreshed = False
-
-# Sidebar
-st.sidebar.header("Chart Settings")
-
-# Add Refresh button at the top of the sidebar
-if st.sidebar.button("Refresh Data"):
-    refresh_data()
-    st.rerun()
-
-timeframe = st.sidebar.selectbox(
-    "Select Timeframe",
-    options=["Weekly", "Daily"],
-    key="timeframe_selector"
-)
-
-tail_length = st.sidebar.slider(
-    "Tail Length",
-    min_value=1,
-    max_value=52,
-    value=5,
-    step=1,
-    help="Number of data points to show in the chart"
-)
-
-st.sidebar.header("Universe Selection")
-
-universe_options = ["WORLD", "US", "US Sectors", "HK", "HK Sub-indexes", "Customised Portfolio", "FX"]
-universe_names = {
-    "WORLD": "World", 
-    "US": "US", 
-    "US Sectors": "US Sectors", 
-    "HK": "Hong Kong", 
-    "HK Sub-indexes": "HK Sub-indexes", 
-    "Customised Portfolio": "Customised Portfolio",
-    "FX": "Foreign Exchange"
-}
-
-selected_universe = st.sidebar.selectbox(
-    "Select Universe",
-    options=universe_options,
-    format_func=lambda x: universe_names[x],
-    key="universe_selector",
-    index=universe_options.index(st.session_state.selected_universe)
-)
-
-# Update the selected universe in session state
-st.session_state.selected_universe = selected_universe
-
-sector = None
-custom_tickers = None
-custom_benchmark = None
-
-if selected_universe == "US Sectors":
-    us_sectors = ["XLK", "XLY", "XLV", "XLF", "XLC", "XLI", "XLE", "XLB", "XLP", "XLU", "XLRE"]
-    us_sector_names = {
-        "XLK": "Technology", "XLY": "Consumer Discretionary", "XLV": "Health Care",
-        "XLF": "Financials", "XLC": "Communications", "XLI": "Industrials", "XLE": "Energy",
-        "XLB": "Materials", "XLP": "Consumer Staples", "XLU": "Utilities", "XLRE": "Real Estate"
-    }
-    st.sidebar.subheader("US Sectors")
-    selected_us_sector = st.sidebar.selectbox(
-        "Select US Sector",
-        options=us_sectors,
-        format_func=lambda x: us_sector_names[x],
-        key="us_sector_selector"
-    )
-    if selected_us_sector:
-        sector = selected_us_sector
-elif selected_universe == "HK Sub-indexes":
-    hk_sectors = ["^HSNU", "^HSNF", "^HSNP", "^HSNC"]
-    hk_sector_names = {"^HSNU": "Utilities", "^HSNF": "Financials", "^HSNP": "Properties", "^HSNC": "Commerce & Industry"}
-    st.sidebar.subheader("Hang Seng Sub-indexes")
-    selected_hk_sector = st.sidebar.selectbox(
-        "Select HK Sub-index",
-        options=hk_sectors,
-        format_func=lambda x: hk_sector_names[x],
-        key="hk_sector_selector"
-    )
-    if selected_hk_sector:
-        sector = selected_hk_sector
-elif selected_universe == "Customised Portfolio":
-    st.sidebar.subheader("Customised Portfolio")
-    
-    if 'reset_tickers' not in st.session_state:
-        st.session_state.reset_tickers = False
-
-    if 'custom_tickers' not in st.session_state or st.session_state.reset_tickers:
-        st.session_state.custom_tickers = get_preset_portfolio()
-
-    col1, col2, col3 = st.sidebar.columns(3)
-    
-    custom_tickers = []
-    for i in range(15):
-        if i % 3 == 0:
-            ticker = col1.text_input(f"Stock {i+1}", key=f"stock_{i+1}", value=st.session_state.custom_tickers[i] if i < len(st.session_state.custom_tickers) else "")
-        elif i % 3 == 1:
-            ticker = col2.text_input(f"Stock {i+1}", key=f"stock_{i+1}", value=st.session_state.custom_tickers[i] if i < len(st.session_state.custom_tickers) else "")
-        else:
-            ticker = col3.text_input(f"Stock {i+1}", key=f"stock_{i+1}", value=st.session_state.custom_tickers[i] if i < len(st.session_state.custom_tickers) else "")
-        
-        if ticker:
-            if ticker.isalpha():
-                processed_ticker = ticker.upper()
-            elif ticker.isdigit():
-                processed_ticker = f"{ticker.zfill(4)}.HK"
-            else:
-                processed_ticker = ticker
-            custom_tickers.append(processed_ticker)
-    
-    st.session_state.custom_tickers = custom_tickers
-
-    custom_benchmark = st.sidebar.selectbox(
-        "Select Benchmark",
-        options=["ACWI", "^GSPC", "^HSI"],
-        key="custom_benchmark_selector"
-    )
 
-    # Add Reset button
-    if st.sidebar.button("Reset to Preset Portfolio"):
-        st.session_state.custom_tickers = get_preset_portfolio()
-        st.rerun()
-
-    # Reset the flag after use
-    if st.session_state.reset_tickers:
-        st.session_state.reset_tickers = False
-
-# Main content area
-if selected_universe:
-    data, benchmark, sectors, sector_names = get_data(selected_universe, sector, timeframe, custom_tickers, custom_benchmark)
-    if data is not None and not data.empty:
-        fig = create_rrg_chart(data, benchmark, sectors, sector_names, selected_universe, timeframe, tail_length)
-        st.plotly_chart(fig, use_container_width=True)
-        st.subheader("Latest Data")
-        st.dataframe(data.tail())
+@st.cache_resource
+def get_load_counter():
+    # Numbers every data load in the process, so results computed from the data are keyed on the load itself;
+    # a refresh that only revises the last bar's close leaves the frame's shape and last date unchanged
+    return itertools.count(1)
+
+
+@st.cache_resource
+def get_prefetcher():
+    # Warms the shared price cache so the next sector drill-down skips the download
+    return Prefetcher(get_price_cache())
+
+@st.cache_resource
+def get_intraday_feed():
+    return IntradayFeed()
+
+@st.cache_resource
+def get_rrg_book():
+    return RRGBook(os.path.join(DEFAULT_STORE_DIR, "rrg_book"))
+
+
+def refresh_data(universe, sector, timeframe, custom_tickers=None, custom_benchmark=None, extra_benchmarks=()):
+    try:
+        # Only this selection is dropped from the shared caches; other users' universes stay warm and
+        # the on-disk price store is kept and topped up with new bars
+        try:
+            benchmark, sectors, _ = resolve_universe(universe, sector, custom_tickers, custom_benchmark)
+            tickers = [benchmark, *extra_benchmarks, *sectors]
+        except UniverseError:
+            tickers = []
+        # Data and RRG keys both start with (kind, universe, sector, timeframe)
+        get_coordinator().invalidate(lambda key: key[0] in ("data", "rrg") and key[1:3] == (universe, sector))
+        get_price_cache().invalidate(tickers)
+        get_intraday_feed().invalidate(tickers)
+
+        # Re-fetch data for the current selection
+        load_data(universe, sector, timeframe, custom_tickers, custom_benchmark, extra_benchmarks)
         
-        if st.session_state.data_refreshed:
-            st.success("Data refreshed successfully!")
-            st.session_state.data_refreshed = False
-    else:
-        st.error("No data available for the selected universe and sector. Please try a different selection.")
-else:
-    st.write("Please select a universe from the sidebar.")
+        st.session_state.live_data = True
+        st.session_state.data_refreshed = True
+    except Exception as e:
+        st.error(f"An error occurred while refreshing data: {str(e)}")
+        st.session_state.data_refreshed = False
 
-if st.checkbox("Show raw data"):
-    st.write("Raw data:")
-    st.write(data)
-    st.write("Sectors:")
-    st.write(sectors)
-    st.write("Benchmark:")
-    st.write(benchmark)
 
- 
+def get_data(universe, sector, timeframe, custom_tickers=None, custom_benchmark=None, extra_benchmarks=()):
+    key = ("data", universe, sector, timeframe, tuple(custom_tickers or ()), custom_benchmark, tuple(extra_benchmarks))
+    (token, result), outcome = get_coordinator().run(key, load_numbered, get_price_cache(), universe, sector,
+                                                     timeframe, custom_tickers, custom_benchmark,
+                                                     extra_benchmarks=extra_benchmarks)
+    # Progress messages belong to the session that did the loading
+    if outcome == MISS:
+        for level, message in result.messages:
+            getattr(st, level)(message)
+    return result.data, result.benchmark, result.sectors, result.sector_names, token
 
- 
 
- 
+def load_numbered(*args, **kwargs):
+    return ("load", next(get_load_counter())), load_universe_data(*args, **kwargs)
 
- 
 
- 
+def get_intraday_data(universe, sector, timeframe, custom_tickers=None, custom_benchmark=None, extra_benchmarks=()):
+    # Not coordinated: the feed keeps its bars in memory and only refetches once its interval has passed.
+    # The buffer version is read first, so bars landing during the load make the next pass recompute.
+    token = ("intraday", get_intraday_feed().buffer.version)
+    result = load_universe_data(get_price_cache(), universe, sector, timeframe, custom_tickers, custom_benchmark,
+                                extra_benchmarks=extra_benchmarks, intraday_feed=get_intraday_feed())
+    for level, message in result.messages:
+        if level in ("warning", "error"):
+            getattr(st, level)(message)
+    return result.data, result.benchmark, result.sectors, result.sector_names, token
 
- 
 
- 
+def load_data(universe, sector, timeframe, custom_tickers=None, custom_benchmark=None, extra_benchmarks=()):
+    loader = get_intraday_data if timeframe in INTRADAY_MINUTES else get_data
+    return loader(universe, sector, timeframe, custom_tickers, custom_benchmark, extra_benchmarks)
 
- 
 
+def get_snapshot(universe, sector, timeframe):
+    # Precomputed by `python -m rrg.batch`; live data is used once the user asks for a refresh
+    if universe in USER_UNIVERSES or st.session_state.get('live_data'):
+        return None
+    return load_snapshot(universe, sector, timeframe, max_age=SNAPSHOT_MAX_AGE)
 
+def compute_rrg_data(data, data_token, benchmark, sectors, universe, sector, timeframe):
+    # Sessions showing the same load share one book update
+    key = ("rrg", universe, sector, timeframe, benchmark, tuple(sectors), data_token)
+    return get_coordinator().run(key, update_rrg_book, data, benchmark, sectors, universe, timeframe)[0]
 
- 
+def update_rrg_book(data, benchmark, sectors, universe, timeframe):
+    if timeframe == "Weekly":
+        data_resampled = to_weekly(data)
+    else:  # Daily
+        data_resampled = data
 
- 
+    # New tickers are seeded from the full history in one pass, known ones only process new bars
+    tickers = list(dict.fromkeys(sectors))
+    scope = f"{universe}/{timeframe}"
+    if universe in USER_UNIVERSES:
+        # Each typed or uploaded list gives the daily frame its own union calendar, so lists only share state
+        # with the same set of columns
+        columns = "\n".join(sorted(map(str, data.columns)))
+        scope += "/" + hashlib.sha1(columns.encode("utf-8")).hexdigest()[:16]
+    book = get_rrg_book()
+    if book.update(data_resampled[tickers], data_resampled[benchmark], scope):
+        book.save()
+    return book.tail_panel(tickers, benchmark, scope)
+
+def get_ratio_panel(data, data_token, benchmarks, sectors, universe, timeframe):
+    # Computed once per data load; the key is cheap to compare, so reruns never hash the prices
+    key = (universe, timeframe, tuple(sectors), tuple(benchmarks), data_token)
+    cached = st.session_state.get('ratio_panel')
+    if cached is None or cached[0] != key:
+        data_resampled = to_weekly(data) if timeframe == "Weekly" else data
+        tickers = list(dict.fromkeys(sectors))
+        cached = (key, ratio_panel(data_resampled[tickers], data_resampled[list(benchmarks)]))
+        st.session_state.ratio_panel = cached
+    return cached
+
+def compute_multi_rrg(data, data_token, benchmarks, sectors, universe, timeframe, params):
+    # Changing the windows only reruns the smoothing over the cached ratios
+    key, ratios = get_ratio_panel(data, data_token, benchmarks, sectors, universe, timeframe)
+    cached = st.session_state.get('multi_rrg')
+    if cached is None or cached[0] != (key, params):
+        cached = ((key, params), rrg_from_ratios(ratios, params))
+        st.session_state.multi_rrg = cached
+    return cached[1]
+
+def compute_compact_rrg(data, data_token, benchmark, sectors, universe, timeframe, params):
+    # Large universes are charted from the float32 panel, computed once per data load and settings
+    from rrg.panel import PricePanel, RRGPanel
+
+    key = (universe, timeframe, tuple(sectors), benchmark, data_token, params)
+    cached = st.session_state.get('compact_rrg')
+    if cached is None or cached[0] != key:
+        bars = to_weekly(data) if timeframe == "Weekly" else data
+        tickers = list(dict.fromkeys(sectors))
+        cached = (key, RRGPanel.compute(PricePanel.from_frame(bars[tickers + [benchmark]]), benchmark, tickers, params))
+        st.session_state.compact_rrg = cached
+    return cached[1]
+
+def get_memory_report(data, data_token, benchmark, sectors, universe, timeframe):
+    # Both representations are rebuilt only when the data load changes, not on every rerun with timings open
+    from rrg.panel import memory_report
+
+    key = (universe, timeframe, tuple(sectors), benchmark, data_token)
+    cached = st.session_state.get('memory_report')
+    if cached is None or cached[0] != key:
+        cached = (key, memory_report(data, benchmark, sectors))
+        st.session_state.memory_report = cached
+    return cached[1]
+
+def compute_clusters(data, data_token, sectors, universe, timeframe, n_clusters, window, shrinkage):
+    # Reclustered only when the data load or the cluster settings change
+    from rrg.cluster import cluster_tickers
+
+    key = (universe, timeframe, tuple(sectors), data_token, n_clusters, window, shrinkage)
+    cached = st.session_state.get('clusters')
+    if cached is None or cached[0] != key:
+        bars = to_weekly(data) if timeframe == "Weekly" else data
+        cached = (key, cluster_tickers(bars[list(dict.fromkeys(sectors))], n_clusters, window, shrinkage))
+        st.session_state.clusters = cached
+    return cached[1]
+
+
+def main():
+    # Set page config to wide layout
+    st.set_page_config(layout="wide", page_title="Relative Rotation Graph (RRG) by JC")
+
+    # The checkbox state is known before the sidebar is drawn, so the recorder spans the whole pass and is
+    # released however it ends (st.rerun, st.stop or an error)
+    with record() if st.session_state.get("show_timings") else nullcontext() as timing_recorder:
+        render_page(timing_recorder)
+
+
+def render_page(timing_recorder=None):
+    st.title("Relative Rotation Graph (RRG) by JC")
+
+    # Initialize session state
+    if 'selected_universe' not in st.session_state:
+        st.session_state.selected_universe = "WORLD"
+    if 'data_refreshed' not in st.session_state:
+        st.session_state.data_refreshed = False
 
+    # Sidebar
+    st.sidebar.header("Chart Settings")
 
- 
+    # Add Refresh button at the top of the sidebar; the refresh runs once the selection below is known
+    refresh_requested = st.sidebar.button("Refresh Data")
 
- 
+    timeframe = st.sidebar.selectbox(
+        "Select Timeframe",
+        options=["Weekly", "Daily", *INTRADAY_MINUTES],
+        key="timeframe_selector"
+    )
+    if timeframe in INTRADAY_MINUTES:
+        st.sidebar.caption(f"Intraday bars are topped up at most every {get_intraday_feed().refresh_seconds}s; "
+                           f"60m bars are built from the 15m feed.")
+
+    tail_length = st.sidebar.slider(
+        "Tail Length",
+        min_value=1,
+        max_value=52,
+        value=5,
+        step=1,
+        help="Number of data points to show in the chart"
+    )
 
- 
+    with st.sidebar.expander("RRG Parameters"):
+        smoothing = st.selectbox("Smoothing", options=["SMA", "EMA"], key="rrg_smoothing",
+                                 help="Moving average used for both RS-Ratio and RS-Momentum")
+        ratio_windows = (
+            st.number_input("RS-Ratio short window", min_value=1, max_value=100,
+                            value=DEFAULT_PARAMS.ratio_windows[0], key="rrg_ratio_short"),
+            st.number_input("RS-Ratio long window", min_value=2, max_value=200,
+                            value=DEFAULT_PARAMS.ratio_windows[1], key="rrg_ratio_long"),
+        )
+        momentum_windows = (
+            st.number_input("RS-Momentum short window", min_value=1, max_value=50,
+                            value=DEFAULT_PARAMS.momentum_windows[0], key="rrg_momentum_short"),
+            st.number_input("RS-Momentum long window", min_value=2, max_value=100,
+                            value=DEFAULT_PARAMS.momentum_windows[1], key="rrg_momentum_long"),
+        )
+    rrg_params = RRGParams(tuple(map(int, ratio_windows)), tuple(map(int, momentum_windows)), smoothing)
+
+    st.sidebar.checkbox("Show timing panel", key="show_timings",
+                        help="Time each stage of the data, RRG and chart pipeline")
+
+    replay = st.sidebar.checkbox("Replay history", help="Animate the rotation over past bars")
+    if replay:
+        replay_bars = st.sidebar.slider(
+            "Replay Length",
+            min_value=20,
+            max_value=500,
+            value=120,
+            step=10,
+            help="Number of past bars to animate"
+        )
+
+    backtest = st.sidebar.checkbox("Backtest rotation rule", help="Hold tickers from an entry quadrant until an exit quadrant")
+    if backtest:
+        # Optional features import their modules on first use so a plain chart view does not pay for them
+        from rrg.backtest import DEFAULT_CONFIG, PERIODS_PER_YEAR, BacktestConfig, run_backtest
+
+        backtest_enter = st.sidebar.multiselect("Enter on", options=QUADRANTS, default=list(DEFAULT_CONFIG.enter),
+                                                key="backtest_enter")
+        backtest_exit = st.sidebar.multiselect("Exit on", options=QUADRANTS, default=list(DEFAULT_CONFIG.exit),
+                                               key="backtest_exit")
+        backtest_confirm = st.sidebar.slider("Confirmation bars", min_value=1, max_value=10, value=1, step=1,
+                                             help="Bars in an entry quadrant before buying")
+        backtest_cost = st.sidebar.number_input("Cost per trade (bps)", min_value=0.0, max_value=100.0, value=0.0, step=1.0)
+
+    cluster = st.sidebar.checkbox("Cluster by correlation",
+                                  help="Colour tickers by groups that move together and draw one centroid tail per group")
+    if cluster:
+        from rrg.cluster import SHRINKAGE_METHODS, ClusterError
+
+        cluster_count = st.sidebar.slider("Clusters", min_value=2, max_value=20, value=8, step=1, key="cluster_count")
+        cluster_window = st.sidebar.slider("Correlation window (bars)", min_value=20, max_value=500, value=120, step=10,
+                                           key="cluster_window")
+        cluster_shrinkage = st.sidebar.selectbox("Shrinkage", options=SHRINKAGE_METHODS, index=1,
+                                                 key="cluster_shrinkage",
+                                                 help="Pull noisy correlations towards zero before clustering")
+        cluster_members_shown = st.sidebar.radio("Cluster view", options=["Members and centroids", "Centroids only"],
+                                                 key="cluster_view") == "Members and centroids"
+
+    st.sidebar.header("Universe Selection")
+
+    universe_options = ["WORLD", "US", "US Sectors", "HK", "HK Sub-indexes", "Customised Portfolio", "Index Constituents", "FX"]
+    universe_names = {
+        "WORLD": "World", 
+        "US": "US", 
+        "US Sectors": "US Sectors", 
+        "HK": "Hong Kong", 
+        "HK Sub-indexes": "HK Sub-indexes", 
+        "Customised Portfolio": "Customised Portfolio",
+        "Index Constituents": "Index Constituents (file)",
+        "FX": "Foreign Exchange"
+    }
 
- 
+    selected_universe = st.sidebar.selectbox(
+        "Select Universe",
+        options=universe_options,
+        format_func=lambda x: universe_names[x],
+        key="universe_selector",
+        index=universe_options.index(st.session_state.selected_universe)
+    )
+
+    # Update the selected universe in session state
+    st.session_state.selected_universe = selected_universe
+
+    sector = None
+    custom_tickers = None
+    custom_benchmark = None
+
+    if selected_universe == "US Sectors":
+        us_sectors = ["XLK", "XLY", "XLV", "XLF", "XLC", "XLI", "XLE", "XLB", "XLP", "XLU", "XLRE"]
+        us_sector_names = {
+            "XLK": "Technology", "XLY": "Consumer Discretionary", "XLV": "Health Care",
+            "XLF": "Financials", "XLC": "Communications", "XLI": "Industrials", "XLE": "Energy",
+            "XLB": "Materials", "XLP": "Consumer Staples", "XLU": "Utilities", "XLRE": "Real Estate"
+        }
+        st.sidebar.subheader("US Sectors")
+        selected_us_sector = st.sidebar.selectbox(
+            "Select US Sector",
+            options=us_sectors,
+            format_func=lambda x: us_sector_names[x],
+            key="us_sector_selector"
+        )
+        if selected_us_sector:
+            sector = selected_us_sector
+    elif selected_universe == "HK Sub-indexes":
+        hk_sectors = ["^HSNU", "^HSNF", "^HSNP", "^HSNC"]
+        hk_sector_names = {"^HSNU": "Utilities", "^HSNF": "Financials", "^HSNP": "Properties", "^HSNC": "Commerce & Industry"}
+        st.sidebar.subheader("Hang Seng Sub-indexes")
+        selected_hk_sector = st.sidebar.selectbox(
+            "Select HK Sub-index",
+            options=hk_sectors,
+            format_func=lambda x: hk_sector_names[x],
+            key="hk_sector_selector"
+        )
+        if selected_hk_sector:
+            sector = selected_hk_sector
+    elif selected_universe == "Customised Portfolio":
+        st.sidebar.subheader("Customised Portfolio")
+
+        if 'reset_tickers' not in st.session_state:
+            st.session_state.reset_tickers = False
+
+        if 'custom_tickers' not in st.session_state or st.session_state.reset_tickers:
+            st.session_state.custom_tickers = get_preset_portfolio() or []
+
+        col1, col2, col3 = st.sidebar.columns(3)
+
+        typed_tickers = []
+        for i in range(15):
+            if i % 3 == 0:
+                ticker = col1.text_input(f"Stock {i+1}", key=f"stock_{i+1}", value=st.session_state.custom_tickers[i] if i < len(st.session_state.custom_tickers) else "")
+            elif i % 3 == 1:
+                ticker = col2.text_input(f"Stock {i+1}", key=f"stock_{i+1}", value=st.session_state.custom_tickers[i] if i < len(st.session_state.custom_tickers) else "")
+            else:
+                ticker = col3.text_input(f"Stock {i+1}", key=f"stock_{i+1}", value=st.session_state.custom_tickers[i] if i < len(st.session_state.custom_tickers) else "")
+
+            typed_tickers.append(ticker)
+
+        custom_tickers = normalize_tickers(typed_tickers)
+        st.session_state.custom_tickers = custom_tickers
+
+        custom_benchmark = st.sidebar.selectbox(
+            "Select Benchmark",
+            options=["ACWI", "^GSPC", "^HSI"],
+            key="custom_benchmark_selector"
+        )
+
+        # Add Reset button
+        if st.sidebar.button("Reset to Preset Portfolio"):
+            st.session_state.custom_tickers = get_preset_portfolio() or []
+            st.rerun()
+
+        # Reset the flag after use
+        if st.session_state.reset_tickers:
+            st.session_state.reset_tickers = False
+    elif selected_universe == "Index Constituents":
+        st.sidebar.subheader("Index Constituents")
+        constituents_file = st.sidebar.file_uploader(
+            "Constituents file",
+            type=["txt", "csv", "xlsx", "xls"],
+            help="One ticker per line, a CSV or a workbook with tickers in the first column"
+        )
+        constituents_source = st.sidebar.text_input(
+            "Or load from URL or file name" if PORTFOLIO_DIR else "Or load from URL",
+            key="constituents_source",
+            help=("http(s) URL of a public host" + (", or a file in the portfolio folder" if PORTFOLIO_DIR else "")
+                  + "; re-read only when the file changes")
+        )
+        try:
+            # Parsed lists are cached by content (uploads) or ETag/mtime (URLs and paths), so reruns skip the parsing
+            if constituents_file is not None:
+                custom_tickers = get_portfolio_loader().parse(constituents_file.getvalue(), constituents_file.name)
+            elif constituents_source.strip():
+                custom_tickers = get_portfolio_loader().load(constituents_source.strip())
+        except PortfolioError as e:
+            st.sidebar.error(str(e))
+        if custom_tickers:
+            st.sidebar.caption(f"{len(custom_tickers)} tickers loaded")
+
+        custom_benchmark = st.sidebar.selectbox(
+            "Select Benchmark",
+            options=["^GSPC", "^NDX", "^RUT", "ACWI", "^HSI"],
+            key="constituents_benchmark_selector"
+        )
+
+    st.sidebar.header("Benchmarks")
+    extra_benchmarks = tuple(st.sidebar.multiselect(
+        "Additional Benchmarks",
+        options=EXTRA_BENCHMARK_OPTIONS,
+        help="Loaded with the universe so you can switch between benchmarks or compare them without refetching",
+        key="extra_benchmark_selector"
+    ))
+    benchmark_view = "Switch"
+    if extra_benchmarks:
+        benchmark_view = st.sidebar.radio("Benchmark View", options=["Switch", "Side by side"], key="benchmark_view_selector")
+
+    if refresh_requested:
+        refresh_data(selected_universe, sector, timeframe, custom_tickers, custom_benchmark, extra_benchmarks)
+
+    # Main content area
+    if selected_universe:
+        # The last exported chart of a built-in selection is drawn before any data is loaded, then replaced in
+        # place once the fresh chart is ready
+        chart_slot = st.empty()
+        if (selected_universe not in USER_UNIVERSES and timeframe not in INTRADAY_MINUTES and not extra_benchmarks
+                and rrg_params == DEFAULT_PARAMS):
+            last_export = load_export(selected_universe, sector, timeframe, tail_length)
+            try:
+                last_fig = None if last_export is None else read_figure(last_export)
+            except (OSError, ValueError):
+                # Another session may have replaced the export between reading its manifest and its files
+                last_fig = None
+            if last_fig is not None:
+                with chart_slot.container():
+                    st.caption(f"Last chart, data to {last_export['last_date'][:10]}. Updating...")
+                    st.plotly_chart(last_fig, use_container_width=True, key="rrg_chart_last")
+
+        # Snapshots only hold the default benchmark and windows
+        snapshot = None if extra_benchmarks or rrg_params != DEFAULT_PARAMS else get_snapshot(selected_universe, sector, timeframe)
+        if snapshot is not None:
+            data, benchmark, sectors, sector_names, rrg_data, generated_at = snapshot
+            data_token = ("snapshot", generated_at)
+        else:
+            with stage("get_data"):
+                data, benchmark, sectors, sector_names, data_token = load_data(selected_universe, sector, timeframe, custom_tickers,
+                                                                   custom_benchmark, extra_benchmarks)
+            rrg_data = None
+            # Sibling sectors load in the background while this one renders; moving to another universe drops only
+            # this session's pending jobs
+            if 'prefetch_owner' not in st.session_state:
+                st.session_state.prefetch_owner = uuid.uuid4().hex
+            get_prefetcher().submit([] if timeframe in INTRADAY_MINUTES else sibling_jobs(selected_universe, sector, timeframe),
+                                    owner=st.session_state.prefetch_owner)
+        if data is not None and not data.empty:
+            benchmarks = [benchmark] + [b for b in dict.fromkeys(extra_benchmarks)
+                                        if b != benchmark and b in data.columns]
+            multi_rrg = None
+            # The incremental book only tracks the default windows against one benchmark
+            if len(benchmarks) > 1 or rrg_params != DEFAULT_PARAMS:
+                multi_rrg = compute_multi_rrg(data, data_token, benchmarks, sectors, selected_universe, timeframe,
+                                              rrg_params)
+                if len(benchmarks) > 1 and benchmark_view == "Switch":
+                    benchmark = st.sidebar.selectbox("Show Benchmark", options=benchmarks, key="shown_benchmark_selector")
+                rrg_data = multi_rrg[benchmark]
+            if rrg_data is None:
+                rrg_data = compute_rrg_data(data, data_token, benchmark, sectors, selected_universe, sector, timeframe)
+
+            render_mode = "Standard"
+            if len(sectors) > LARGE_UNIVERSE_THRESHOLD:
+                st.sidebar.header("Large Universe")
+                render_mode = st.sidebar.radio(
+                    "Rendering",
+                    options=["All tickers (WebGL)", "Top movers per quadrant"],
+                    key="render_mode_selector"
+                )
+
+            clusters = None
+            if cluster:
+                try:
+                    with stage("cluster"):
+                        clusters = compute_clusters(data, data_token, sectors, selected_universe, timeframe,
+                                                    cluster_count, cluster_window, cluster_shrinkage)
+                except ClusterError as e:
+                    st.warning(str(e))
+
+            # Built-in selections on the default windows are drawn once per data change and shared by every viewer
+            shareable = (selected_universe not in USER_UNIVERSES and multi_rrg is None and clusters is None
+                         and timeframe not in INTRADAY_MINUTES and render_mode == "Standard")
+            artifact = None
+            build_started = time.perf_counter()
+            if multi_rrg is not None and benchmark_view == "Side by side":
+                fig = None
+                for column, shown_benchmark in zip(chart_slot.container().columns(len(benchmarks)), benchmarks):
+                    with column, stage("render"):
+                        st.plotly_chart(create_rrg_chart(multi_rrg[shown_benchmark], shown_benchmark, sectors, sector_names,
+                                                         selected_universe, timeframe, tail_length),
+                                        use_container_width=True, key=f"rrg_chart_{shown_benchmark}")
+            elif clusters is not None:
+                fig = create_cluster_rrg_chart(rrg_data, benchmark, sectors, clusters.labels, selected_universe, timeframe,
+                                               tail_length, cluster_members_shown)
+            elif render_mode == "All tickers (WebGL)":
+                compact = compute_compact_rrg(data, data_token, benchmark, sectors, selected_universe, timeframe, rrg_params)
+                fig = create_large_rrg_chart(compact, benchmark, sectors, selected_universe, timeframe, tail_length)
+            elif render_mode == "Top movers per quadrant":
+                top_n = st.sidebar.slider("Tickers per quadrant", min_value=1, max_value=50, value=10, step=1)
+                compact = compute_compact_rrg(data, data_token, benchmark, sectors, selected_universe, timeframe, rrg_params)
+                shown_sectors = top_movers(compact, sectors, tail_length, top_n)
+                fig = create_rrg_chart(rrg_data, benchmark, shown_sectors, sector_names, selected_universe, timeframe, tail_length)
+            elif shareable:
+                artifact, _ = export_rrg(selected_universe, sector, timeframe, rrg_data, benchmark, sectors, sector_names,
+                                         tail_length)
+                try:
+                    fig = None if artifact is None else read_figure(artifact)
+                except (OSError, ValueError):
+                    fig = None
+                if fig is None:
+                    artifact = None
+                    fig = create_rrg_chart(rrg_data, benchmark, sectors, sector_names, selected_universe, timeframe,
+                                           tail_length)
+            else:
+                fig = create_rrg_chart(rrg_data, benchmark, sectors, sector_names, selected_universe, timeframe, tail_length)
+            build_seconds = time.perf_counter() - build_started
+            if fig is not None:
+                with stage("render"):
+                    chart_slot.plotly_chart(fig, use_container_width=True)
+            if fig is not None and render_mode != "Standard":
+                st.caption(f"{len(sectors)} tickers, {len(fig.data)} traces. Figure built in {build_seconds * 1000:.0f} ms, "
+                           f"payload {figure_payload_size(fig) / 1024:.0f} KB")
+            if clusters is not None:
+                from rrg.cluster import cluster_members
+
+                st.caption(f"{clusters.labels.nunique()} clusters of {len(clusters.labels)} tickers from "
+                           f"{cluster_window}-bar return correlations, shrinkage weight {clusters.shrinkage:.2f}")
+                with st.expander("Cluster members"):
+                    st.dataframe(cluster_members(clusters.labels), hide_index=True, use_container_width=True)
+            if artifact is not None and st.checkbox("Export chart files", key="show_exports"):
+                name = f"rrg_{selected_universe}_{sector or 'all'}_{timeframe}".replace(" ", "_")
+                for column, (kind, label, mime) in zip(st.columns(len(EXPORT_DOWNLOADS)), EXPORT_DOWNLOADS):
+                    try:
+                        with open(artifact["files"][kind], "rb") as f:
+                            column.download_button(label, f.read(), file_name=f"{name}.{kind}", mime=mime)
+                    except OSError:
+                        column.caption(f"{label} unavailable, rerun to rebuild")
+
+            if replay:
+                import streamlit.components.v1 as components
+                from rrg.replay import create_replay_chart, replay_html
+
+                st.subheader("History Replay")
+                # Snapshots already hold the full history; the live path only keeps the latest tail
+                history = rrg_data if len(rrg_data) >= replay_bars else calculate_rrg_for_timeframe(data, benchmark, sectors, timeframe, rrg_params)
+                replay_fig = create_replay_chart(history, benchmark, sectors, sector_names, selected_universe, timeframe,
+                                                 tail_length, max_frames=replay_bars, webgl=len(sectors) > LARGE_UNIVERSE_THRESHOLD)
+                with stage("render"):
+                    components.html(replay_html(replay_fig), height=850)
+            st.subheader("Rotation Screener")
+            screener = rotation_screener(rrg_data, sectors, sector_names, tail_length)
+            filter_columns = st.columns(2)
+            screen_quadrants = filter_columns[0].multiselect("Quadrant", options=QUADRANTS, key="screener_quadrants")
+            screen_bars = filter_columns[1].number_input("Entered on one of the last N bars (0 = any)", min_value=0, value=0,
+                                                         step=1, key="screener_bars")
+            screener = filter_screener(screener, screen_quadrants, screen_bars or None)
+            st.caption(f"{len(screener)} of {len(sectors)} tickers. Click a column header to sort.")
+            st.dataframe(screener, hide_index=True, use_container_width=True,
+                         column_config={"Entered": st.column_config.DateColumn(format="YYYY-MM-DD")})
+
+            if backtest:
+                st.subheader("Rotation Backtest")
+                bars = to_weekly(data) if timeframe == "Weekly" else data
+                config = BacktestConfig(rrg_params, tuple(backtest_enter), tuple(backtest_exit), backtest_confirm,
+                                        backtest_cost)
+                result = run_backtest(bars[list(dict.fromkeys(sectors))], bars[benchmark], config,
+                                      PERIODS_PER_YEAR[timeframe])
+                equity = pd.DataFrame({"Strategy": (1 + result.returns).cumprod(),
+                                       benchmark: bars[benchmark] / bars[benchmark].dropna().iloc[0]})
+                st.line_chart(equity)
+                st.dataframe(pd.DataFrame([result.summary]), hide_index=True)
+
+            st.subheader("Latest Data")
+            st.dataframe(data.tail())
+
+            if st.session_state.data_refreshed:
+                st.success("Data refreshed successfully!")
+                st.session_state.data_refreshed = False
+        else:
+            chart_slot.empty()
+            st.error("No data available for the selected universe and sector. Please try a different selection.")
+    else:
+        st.write("Please select a universe from the sidebar.")
+
+    if timing_recorder is not None:
+        st.subheader("Timing")
+        st.caption("Loads served by the shared coordinator (get_data on a hit or after waiting on another session) "
+                   "skip the nested fetch stage.")
+        st.dataframe(timing_recorder.as_frame())
+        st.caption("Shared cache since the server started: hits, misses and requests that waited on another session")
+        st.dataframe(get_coordinator().metrics(), hide_index=True)
+        if data is not None and not data.empty:
+            st.caption("Memory of the loaded prices and their RRG as float64 frames and as compact float32 panels")
+            st.dataframe(get_memory_report(data, data_token, benchmark, sectors, selected_universe, timeframe),
+                         hide_index=True)
+
+    if st.checkbox("Show raw data"):
+        st.write("Raw data:")
+        st.write(data)
+        st.write("Sectors:")
+        st.write(sectors)
+        st.write("Benchmark:")
+        st.write(benchmark)
+
+
+# Importing the module only defines the app; Streamlit runs it as __main__
+if __name__ == "__main__":
+    main()